@@ -25,13 +25,9 @@ echo "MongoDB: [configured]"
 echo "WatsonX: [configured]"
 
 # Start Flask sentiment service in background on internal port
+# (gunicorn, workers/threads from SENTIMENT_WORKERS/SENTIMENT_THREADS)
 cd /app/flask
-unset PORT  # Clear PORT to prevent conflicts
-python -c "
-import os
-os.environ['PORT'] = '5000'
-exec(open('app.py').read())
-" &
+PORT=5000 gunicorn --config gunicorn.conf.py app:app &
 FLASK_PID=$!
 echo "Flask sentiment service started with PID: $FLASK_PID on port 5000"
 
@@ -85,6 +81,12 @@ for path in "/app/frontend/build/index.html" "/app/build/index.html"; do
 done
 echo "============== END REACT BUILD DEBUG =============="
 
+# Django worker processes, and a cache they all share so that catalog
+# invalidations reach every worker (see the djangoapp.W001 check)
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-3}"
+export CACHE_BACKEND="${CACHE_BACKEND:-django.core.cache.backends.filebased.FileBasedCache}"
+export CACHE_LOCATION="${CACHE_LOCATION:-/tmp/django-cache}"
+
 echo "================ DATABASE SETUP START ================"
 # Always attempt to run migrations, even if they fail
 echo "Running Django migrations directly first..."
@@ -92,6 +94,7 @@ python manage.py makemigrations djangoapp --noinput || echo "makemigrations djan
 python manage.py migrate djangoapp --noinput || echo "migrate djangoapp failed, continuing"
 python manage.py makemigrations --noinput || echo "makemigrations failed, continuing"
 python manage.py migrate --noinput || echo "migrate failed, continuing"
+python manage.py purge_idempotency_keys || echo "purge_idempotency_keys failed, continuing"
 
 # Run Django-based database setup to populate products and users
 echo "Running Django database setup to populate data..."
@@ -382,7 +385,7 @@ echo "============================================="
 # Render automatically assigns PORT environment variable - use it, fallback to 8000
 # Make sure we use the exact PORT that Render expects
 export DJANGO_PORT="${PORT:-8000}"
-echo "================ STARTING GUNICORN ================"
+echo "================ STARTING UVICORN ================"
 echo "Render PORT environment variable: $PORT"
 echo "Django will bind to: $DJANGO_PORT"
 echo "Current directory: $(pwd)"
@@ -392,6 +395,13 @@ echo "Quick database check:"
 sqlite3 db.sqlite3 "SELECT COUNT(*) FROM djangoapp_product;" || echo "Failed to query product count"
 echo "Sample products:"
 sqlite3 db.sqlite3 "SELECT id, name, category, price FROM djangoapp_product LIMIT 3;" || echo "Failed to query sample products"
-echo "================ GUNICORN STARTING ================"
+echo "================ UVICORN STARTING ================"
+
+# Start the background job worker (sentiment scoring of new reviews)
+python manage.py run_worker --threads "${JOB_WORKER_THREADS:-2}" &
+WORKER_PID=$!
+echo "Job worker started with PID: $WORKER_PID"
 
-gunicorn --bind 0.0.0.0:$DJANGO_PORT --workers 3 djangoproj.wsgi
+# Serve Django with uvicorn (ASGI), so the async views share one pooled
+# upstream client per worker, opened and closed in the ASGI lifespan
+uvicorn djangoproj.asgi:application --host 0.0.0.0 --port $DJANGO_PORT --workers $WEB_CONCURRENCY --lifespan on
@@ -0,0 +1,202 @@
+#!/bin/python
+"""
+Concurrency benchmark for the async upstream-calling views.
+
+Starts a stub upstream that stands in for both the Express backend and the
+sentiment analyzer, answering every request after a fixed latency. Then it
+serves the app with one sync gunicorn worker and with one uvicorn worker,
+and fires concurrent requests at GET /djangoapp/api/products/<id>/reviews.
+Each request fetches the product's reviews from the backend and scores the
+unlabelled ones concurrently.
+
+The "peak in-flight" column is the largest number of requests the stub saw
+at the same time. It shows how many requests one worker keeps in progress
+while it waits on upstreams.
+
+Usage:
+    python benchmark_async.py [--server gunicorn|uvicorn|both] [--concurrency 50]
+                              [--requests 200] [--latency 0.2]
+
+Requires httpx and uvicorn.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async workers on upstream-bound views")
+    parser.add_argument('--server', choices=['gunicorn', 'uvicorn', 'both'], default='both',
+                        help='Worker type to benchmark')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent client requests')
+    parser.add_argument('--requests', type=int, default=200, help='Total requests per run')
+    parser.add_argument('--latency', type=float, default=0.2, help='Upstream response time in seconds')
+    return parser.parse_args()
+
+
+class StubUpstream(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def reset(self):
+        with self.lock:
+            self.in_flight = 0
+            self.peak_in_flight = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server
+        with stub.lock:
+            stub.in_flight += 1
+            stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+        try:
+            time.sleep(stub.latency)
+            if self.path.startswith('/analyze/'):
+                body = {'label': 'positive', 'score': 0.9}
+            else:
+                body = [{'id': i, 'review': f'Review {i}', 'sentiment': ''} for i in range(3)]
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepare_database(db_path):
+    """Migrate a throwaway database and seed one product"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
+    sys.path.insert(0, SERVER_DIR)
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from djangoapp.models import Product
+
+    call_command('migrate', verbosity=0)
+    return Product.objects.create(
+        name='Benchmark Product', category='Benchmark', price=1,
+        description='', stock_quantity=10,
+    ).id
+
+
+def start_server(kind, port, env):
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', 'djangoproj.wsgi:application',
+                   '--workers', '1', '--threads', '1', '--timeout', '300',
+                   '--bind', f'127.0.0.1:{port}']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'djangoproj.asgi:application',
+                   '--workers', '1', '--no-access-log', '--port', str(port)]
+    return subprocess.Popen(command, cwd=SERVER_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_until_ready(client, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(url)
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+async def load(base_url, product_id, args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+        await wait_until_ready(client, f'{base_url}/djangoapp/health-check')
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        errors = 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(f'{base_url}/djangoapp/api/products/{product_id}/reviews')
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200 or response.json().get('status') != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        return time.perf_counter() - started, sorted(latencies), errors
+
+
+def run(kind, stub, product_id, db_path, args):
+    port = free_port()
+    env = dict(os.environ,
+               DATABASE_URL=f'sqlite:///{db_path}',
+               backend_url=f'http://127.0.0.1:{stub.server_address[1]}',
+               sentiment_analyzer_url=f'http://127.0.0.1:{stub.server_address[1]}/',
+               DEBUG='False', ALLOWED_HOSTS='127.0.0.1,localhost',
+               CIRCUIT_FAILURE_THRESHOLD='1000000')
+    process = start_server(kind, port, env)
+    try:
+        stub.reset()
+        elapsed, latencies, errors = asyncio.run(load(f'http://127.0.0.1:{port}', product_id, args))
+    finally:
+        process.terminate()
+        process.wait()
+
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{kind:<10} {args.requests / elapsed:>10.1f} {p50 * 1000:>10.0f} {p95 * 1000:>10.0f} "
+          f"{stub.peak_in_flight:>15} {errors:>8}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    db_dir = tempfile.mkdtemp(prefix='benchmark-async-')
+    db_path = os.path.join(db_dir, 'benchmark.sqlite3')
+    product_id = prepare_database(db_path)
+
+    stub = StubUpstream(args.latency)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {args.latency * 1000:.0f}ms upstream latency")
+    print(f"{'Worker':<10} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'peak in-flight':>15} {'errors':>8}")
+    try:
+        for kind in (['gunicorn', 'uvicorn'] if args.server == 'both' else [args.server]):
+            run(kind, stub, product_id, db_path, args)
+    finally:
+        stub.shutdown()
+        shutil.rmtree(db_dir, ignore_errors=True)
@@ -0,0 +1,151 @@
+#!/bin/python
+"""
+Read/write throughput benchmark for the SQLite connection settings.
+
+Creates a throwaway SQLite file database with a product catalog, then runs
+reader threads (catalog listings and product lookups) alongside writer
+threads (stock reservations, the same conditional UPDATEs checkout runs)
+for a fixed time. The "stock" profile uses SQLite's defaults (rollback
+journal, synchronous=FULL, no mmap); the "tuned" profile uses the
+SQLITE_PRAGMAS from settings. Each profile runs in its own process because
+Django settings can only be configured once.
+
+Usage:
+    python benchmark_sqlite.py [--profile stock|tuned|both] [--seconds 5]
+                               [--readers 8] [--writers 4] [--products 2000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Environment overrides reproducing SQLite's out-of-the-box behaviour
+STOCK_PRAGMAS = {
+    'SQLITE_JOURNAL_MODE': 'delete',
+    'SQLITE_SYNCHRONOUS': 'full',
+    'SQLITE_MMAP_SIZE': '0',
+    'SQLITE_CACHE_SIZE': '-2000',
+    'SQLITE_TEMP_STORE': 'default',
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite read/write throughput")
+    parser.add_argument('--profile', choices=['stock', 'tuned', 'both'], default='both',
+                        help='Connection settings to benchmark')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration of each run')
+    parser.add_argument('--readers', type=int, default=8, help='Reader threads')
+    parser.add_argument('--writers', type=int, default=4, help='Writer threads')
+    parser.add_argument('--products', type=int, default=2000, help='Products to seed')
+    return parser.parse_args()
+
+
+def setup_django(db_path):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db_path
+
+    import django
+    django.setup()
+
+
+def run(args, profile):
+    if profile == 'stock':
+        os.environ.update(STOCK_PRAGMAS)
+    db_dir = tempfile.mkdtemp(prefix='benchmark-sqlite-')
+    db_path = os.path.join(db_dir, 'benchmark.sqlite3')
+    setup_django(db_path)
+
+    from django.core.management import call_command
+    from django.db import connection, OperationalError
+    from django.http import QueryDict
+    from djangoapp import inventory
+    from djangoapp.models import Product
+    from djangoapp.views import filter_products
+
+    call_command('migrate', verbosity=0)
+    Product.objects.bulk_create([
+        Product(name=f'Product {i:05d}', category=f'Category {i % 20}', price=10,
+                description='Benchmark product', stock_quantity=10 ** 9)
+        for i in range(args.products)
+    ], batch_size=500)
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        journal_mode = cursor.fetchone()[0]
+        cursor.execute("PRAGMA synchronous")
+        synchronous = cursor.fetchone()[0]
+    print(f"[{profile}] journal_mode={journal_mode} synchronous={synchronous} database={db_path}")
+    connection.close()
+
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def bump(key, amount=1):
+        with lock:
+            counts[key] += amount
+
+    def reader():
+        done = 0
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    category = f'Category {random.randrange(20)}'
+                    list(filter_products(QueryDict(f'category={category}')).order_by('name', 'id')[:50])
+                    Product.objects.get(pk=random.choice(product_ids))
+                    done += 2
+                except OperationalError:
+                    bump('locked')
+        finally:
+            bump('reads', done)
+            connection.close()
+
+    def writer():
+        done = 0
+        try:
+            while time.perf_counter() < deadline:
+                product_id = random.choice(product_ids)
+                try:
+                    inventory.reserve(product_id, 1)
+                    inventory.release(product_id, 1)
+                    done += 2
+                except OperationalError:
+                    bump('locked')
+        finally:
+            bump('writes', done)
+            connection.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"[{profile}] {args.readers} readers, {args.writers} writers for {elapsed:.1f}s: "
+          f"{counts['reads'] / elapsed:,.0f} reads/s, {counts['writes'] / elapsed:,.0f} writes/s, "
+          f"{counts['locked']} 'database is locked' errors")
+
+    shutil.rmtree(db_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.profile == 'both':
+        for profile in ('stock', 'tuned'):
+            subprocess.run([
+                sys.executable, __file__, '--profile', profile,
+                '--seconds', str(args.seconds), '--readers', str(args.readers),
+                '--writers', str(args.writers), '--products', str(args.products),
+            ])
+        sys.exit(0)
+    run(args, args.profile)
@@ -1,7 +1,7 @@
 
 # Register your models here.
 from django.contrib import admin
-from .models import UserProfile, Product, Order, Review, SupportTicket, CartItem
+from .models import UserProfile, Product, Order, Review, SupportTicket, CartItem, Job
 
 admin.site.register(UserProfile)
 admin.site.register(Product)
@@ -9,3 +9,4 @@ admin.site.register(Order)
 admin.site.register(Review)
 admin.site.register(SupportTicket)
 admin.site.register(CartItem)
+admin.site.register(Job)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class DjangoappConfig(AppConfig):
     name = 'djangoapp'
+
+    def ready(self):
+        # Register system checks, signal handlers and background tasks
+        from . import checks, signals, tasks  # noqa: F401
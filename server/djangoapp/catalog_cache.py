@@ -0,0 +1,134 @@
+"""
+Shared cache for catalog reads (product pages, product detail, categories).
+
+Entries hold pre-serialized JSON bytes so a cache hit skips both the database
+and the serializer. Product list pages and the category list are keyed by a
+generation token; any product change replaces the token with a fresh random
+one, which retires all list entries at once. Product detail entries are
+deleted individually.
+
+The cache backend must be shared by every process serving requests, or
+invalidations only reach the process that made the change (see
+djangoapp.checks).
+"""
+import hashlib
+import json
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+KEY_PREFIX = "catalog"
+GENERATION_KEY = f"{KEY_PREFIX}:generation"
+HITS_KEY = f"{KEY_PREFIX}:stats:hits"
+MISSES_KEY = f"{KEY_PREFIX}:stats:misses"
+
+# Query parameters that affect the product listing; anything else is ignored
+# so that cache-busting junk parameters do not fragment the cache
+PAGE_PARAMS = ('cursor', 'limit', 'category', 'min_price', 'max_price', 'in_stock')
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key missing or evicted - start counting again
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def _new_generation():
+    # Random rather than counted, so a generation lost to eviction or a
+    # restart can never come back and revive list pages cached under it
+    return secrets.token_hex(8)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _new_generation(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _get_or_build(key, builder):
+    content = cache.get(key)
+    if content is not None:
+        _incr(HITS_KEY)
+        return content
+    _incr(MISSES_KEY)
+    content = json.dumps(builder(), cls=DjangoJSONEncoder).encode('utf-8')
+    cache.set(key, content, _timeout())
+    return content
+
+
+def page_key(params):
+    """Build the cache key for a product listing page from its query parameters"""
+    normalized = "&".join(f"{name}={params.get(name, '')}" for name in PAGE_PARAMS)
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}:g{_generation()}:page:{digest}"
+
+
+def product_key(product_id):
+    return f"{KEY_PREFIX}:product:{product_id}"
+
+
+def categories_key():
+    return f"{KEY_PREFIX}:g{_generation()}:categories"
+
+
+def get_page(params, builder):
+    """Return the JSON bytes for a product listing page, building it on a miss"""
+    return _get_or_build(page_key(params), builder)
+
+
+def get_product(product_id, builder):
+    """Return the JSON bytes for a single product, building it on a miss"""
+    return _get_or_build(product_key(product_id), builder)
+
+
+def get_categories(builder):
+    """Return the JSON bytes for the category list, building it on a miss"""
+    return _get_or_build(categories_key(), builder)
+
+
+def invalidate_product(product_id=None):
+    """
+    Drop cached entries affected by a product change.
+    Deletes the product's detail entry and retires every list page and the
+    category list by replacing the generation.
+    """
+    if product_id is not None:
+        cache.delete(product_key(product_id))
+    cache.set(GENERATION_KEY, _new_generation(), None)
+
+
+def invalidate_products(product_ids):
+    """invalidate_product() for many products, with one generation change"""
+    cache.delete_many([product_key(product_id) for product_id in product_ids])
+    invalidate_product()
+
+
+def stats():
+    """Return hit/miss counters for the catalog cache"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "generation": _generation(),
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
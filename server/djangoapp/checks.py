@@ -0,0 +1,48 @@
+"""
+System checks for deployment settings the app relies on.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+# Backends whose entries are private to the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Catalog invalidation (djangoapp.catalog_cache) only reaches processes
+    sharing the cache, so several workers on a process-local cache would
+    keep serving stale stock levels.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    workers = getattr(settings, 'WEB_CONCURRENCY', 1)
+    if workers > 1 and backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f"The default cache ({backend}) is local to each process, but "
+            f"WEB_CONCURRENCY is {workers}.",
+            hint="Set CACHE_BACKEND to a shared backend such as "
+                 "django.core.cache.backends.filebased.FileBasedCache or "
+                 "django.core.cache.backends.redis.RedisCache.",
+            id='djangoapp.W001',
+        )]
+    return []
+
+
+@register()
+def check_transaction_id_generator(app_configs, **kwargs):
+    """The configured generator must be constructible, e.g. Snowflake needs a worker id"""
+    path = getattr(settings, 'TRANSACTION_ID_GENERATOR', 'djangoapp.ids.ULIDGenerator')
+    try:
+        import_string(path)()
+    except (ImportError, ImproperlyConfigured, ValueError) as e:
+        return [Error(
+            f"TRANSACTION_ID_GENERATOR {path} cannot be used: {e}",
+            id='djangoapp.E001',
+        )]
+    return []
@@ -0,0 +1,227 @@
+"""
+Bulk exports of orders, support tickets and reviews as CSV or NDJSON.
+
+Rows are read as plain tuples with values_list(...).iterator(), encoded as
+they arrive and, if asked, gzip-compressed on the fly. Nothing holds more
+than one fetch chunk and one output buffer, so a full-history export runs
+in constant memory. Used by the export view and `manage.py export`.
+"""
+import csv
+import datetime
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import streaming
+from .models import Order, Review, SupportTicket
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched from the database per round trip
+EXPORT_CHUNK_SIZE = 5000
+
+# Characters collected before a piece of output is handed on
+EXPORT_BUFFER_SIZE = 256 * 1024
+
+# zlib level for gzip output; low levels keep up with disk and network
+GZIP_LEVEL = 6
+
+# A CSV cell starting with one of these is run as a formula by spreadsheet
+# apps, so text cells that do are prefixed with a quote (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Export:
+    """One exportable table: its columns (name, lookup), date and status fields"""
+
+    def __init__(self, model, columns, date_field, status_field=None):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+        self.status_field = status_field
+
+    @property
+    def header(self):
+        return [name for name, _ in self.columns]
+
+    @property
+    def datetime_columns(self):
+        """Indexes of the columns holding datetimes, which CSV writes as ISO 8601"""
+        return [
+            index for index, (_, lookup) in enumerate(self.columns)
+            if '__' not in lookup and self.model._meta.get_field(lookup).get_internal_type() == 'DateTimeField'
+        ]
+
+    @property
+    def text_columns(self):
+        """Indexes of the columns holding text, which CSV guards against formulas"""
+        return [
+            index for index, (_, lookup) in enumerate(self.columns)
+            if self._field(lookup).get_internal_type() in ('CharField', 'TextField')
+        ]
+
+    def _field(self, lookup):
+        # Follow a lookup such as customer__username to the field it ends on
+        model = self.model
+        *relations, name = lookup.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    @property
+    def statuses(self):
+        if not self.status_field:
+            return []
+        return [value for value, _ in self.model._meta.get_field(self.status_field).choices]
+
+
+EXPORTS = {
+    'orders': Export(Order, [
+        ('id', 'id'),
+        ('transaction_id', 'transaction_id'),
+        ('customer', 'customer__username'),
+        ('product', 'product__name'),
+        ('quantity', 'quantity'),
+        ('total_amount', 'total_amount'),
+        ('status', 'status'),
+        ('date_purchased', 'date_purchased'),
+        ('processed_by', 'processed_by__username'),
+        ('processed_at', 'processed_at'),
+        ('notes', 'notes'),
+    ], date_field='date_purchased', status_field='status'),
+    'tickets': Export(SupportTicket, [
+        ('id', 'id'),
+        ('customer', 'customer__username'),
+        ('product', 'product__name'),
+        ('transaction_id', 'order__transaction_id'),
+        ('status', 'status'),
+        ('submitted_on', 'submitted_on'),
+        ('issue_description', 'issue_description'),
+        ('resolution_note', 'resolution_note'),
+    ], date_field='submitted_on', status_field='status'),
+    'reviews': Export(Review, [
+        ('id', 'id'),
+        ('customer', 'customer__username'),
+        ('rating', 'rating'),
+        ('sentiment', 'sentiment'),
+        ('moderated', 'moderated'),
+        ('created_on', 'created_on'),
+        ('review_text', 'review_text'),
+    ], date_field='created_on'),
+}
+
+
+def parse_day(value, name):
+    """A YYYY-MM-DD filter value as a date, None if empty"""
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f"{name} must be a date as YYYY-MM-DD, got {value!r}")
+    return day
+
+
+def queryset(table, since=None, until=None, statuses=None):
+    """
+    The rows of an export as a values_list queryset, oldest first. since and
+    until are inclusive dates; statuses limits the rows to those statuses.
+    Raises ValueError for an unknown table or status.
+    """
+    export = EXPORTS.get(table)
+    if export is None:
+        raise ValueError(f"Unknown export {table!r}, expected one of {', '.join(EXPORTS)}")
+
+    rows = export.model.objects.all()
+    field = export.date_field
+    if export.model._meta.get_field(field).get_internal_type() == 'DateTimeField':
+        # Whole days in the current time zone, as a range the index can serve
+        if since:
+            rows = rows.filter(**{f'{field}__gte': _start_of(since)})
+        if until:
+            rows = rows.filter(**{f'{field}__lt': _start_of(until + datetime.timedelta(days=1))})
+    else:
+        if since:
+            rows = rows.filter(**{f'{field}__gte': since})
+        if until:
+            rows = rows.filter(**{f'{field}__lte': until})
+
+    if statuses:
+        if not export.status_field:
+            raise ValueError(f"{table} cannot be filtered by status")
+        unknown = set(statuses) - set(export.statuses)
+        if unknown:
+            raise ValueError(f"Unknown status {', '.join(sorted(unknown))}, expected one of {', '.join(export.statuses)}")
+        rows = rows.filter(**{f'{export.status_field}__in': statuses})
+
+    return rows.order_by(field, 'pk').values_list(*(lookup for _, lookup in export.columns))
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+class _Echo:
+    # csv.writer target that hands back each line instead of storing it
+    def write(self, value):
+        return value
+
+
+def encode_csv(export, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(export.header)
+    datetime_columns = export.datetime_columns
+    text_columns = export.text_columns
+    for row in rows:
+        row = list(row)
+        for index in datetime_columns:
+            if row[index] is not None:
+                row[index] = row[index].isoformat()
+        for index in text_columns:
+            value = row[index]
+            if value and value.startswith(FORMULA_PREFIXES):
+                row[index] = "'" + value
+        yield writer.writerow(row)
+
+
+def encode_ndjson(export, rows):
+    encoder = DjangoJSONEncoder()
+    header = export.header
+    for row in rows:
+        yield encoder.encode(dict(zip(header, row))) + '\n'
+
+
+def gzip_stream(chunks, level=GZIP_LEVEL):
+    """Compress a stream of bytes into a gzip stream, piece by piece"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream(rows, table, format='csv', compress=False, level=GZIP_LEVEL):
+    """
+    The export of rows (from queryset()) as a stream of bytes in format,
+    gzip-compressed if compress is set. Rows are fetched as it is consumed.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+    encode = encode_csv if format == 'csv' else encode_ndjson
+    # Pin the database now; the stream may be consumed after a view returns
+    rows = rows.using(rows.db).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    chunks = (part.encode() for part in streaming.buffered(encode(EXPORTS[table], rows), EXPORT_BUFFER_SIZE))
+    return gzip_stream(chunks, level) if compress else chunks
+
+
+def filename(table, format, compress=False):
+    name = f"{table}-{timezone.localdate():%Y%m%d}.{format}"
+    return name + '.gz' if compress else name
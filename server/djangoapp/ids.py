@@ -0,0 +1,120 @@
+"""
+Transaction ID generators.
+
+IDs are monotonic within a process, sort by creation time as plain strings
+and are unique across processes without coordination. The generator used
+for new orders is selected with the TRANSACTION_ID_GENERATOR setting
+(a dotted path to a class with a `generate()` method).
+"""
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+# Crockford's base32 - sorts lexicographically in numeric order
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def _encode_base32(value, length):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(CROCKFORD_ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+class ULIDGenerator:
+    """
+    ULID: 48-bit millisecond timestamp + 80 random bits, 26 characters.
+    Within the same millisecond the random part is incremented, so IDs from
+    one process are strictly increasing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def generate(self):
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms <= self._last_ms:
+                # Same (or earlier, if the clock stepped back) millisecond
+                now_ms = self._last_ms
+                self._last_random += 1
+                if self._last_random >= 1 << 80:
+                    # Randomness exhausted for this millisecond - borrow the next one
+                    now_ms += 1
+                    self._last_random = secrets.randbits(79)
+            else:
+                # Leave headroom so increments within a millisecond don't overflow
+                self._last_random = secrets.randbits(79)
+            self._last_ms = now_ms
+            return _encode_base32(now_ms, 10) + _encode_base32(self._last_random, 16)
+
+
+class SnowflakeGenerator:
+    """
+    Snowflake: 41-bit millisecond timestamp | 10-bit worker id | 12-bit sequence,
+    rendered as 13 base32 characters. Unique only as long as every process
+    generating IDs has its own worker id (0-1023), so the id must be
+    configured explicitly with TRANSACTION_ID_WORKER_ID; there is no default.
+    """
+
+    EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+    MAX_WORKER_ID = 0x3FF
+
+    def __init__(self, worker_id=None):
+        if worker_id is None:
+            worker_id = getattr(settings, 'TRANSACTION_ID_WORKER_ID', None)
+        if worker_id is None:
+            raise ImproperlyConfigured(
+                "SnowflakeGenerator needs TRANSACTION_ID_WORKER_ID, unique to each process generating IDs"
+            )
+        worker_id = int(worker_id)
+        if not 0 <= worker_id <= self.MAX_WORKER_ID:
+            raise ImproperlyConfigured(
+                f"TRANSACTION_ID_WORKER_ID must be between 0 and {self.MAX_WORKER_ID}, got {worker_id}"
+            )
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def generate(self):
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000 - self.EPOCH_MS
+            if now_ms <= self._last_ms:
+                now_ms = self._last_ms
+                self._sequence = (self._sequence + 1) & 0xFFF
+                if self._sequence == 0:
+                    # 4096 IDs issued this millisecond - move on to the next one
+                    now_ms += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            value = (now_ms << 22) | (self.worker_id << 12) | self._sequence
+            return _encode_base32(value, 13)
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """Return the process-wide generator configured by TRANSACTION_ID_GENERATOR"""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                path = getattr(settings, 'TRANSACTION_ID_GENERATOR', 'djangoapp.ids.ULIDGenerator')
+                _generator = import_string(path)()
+    return _generator
+
+
+def new_transaction_id():
+    """Return a new unique, time-sortable transaction ID"""
+    return f"TXN{get_generator().generate()}"
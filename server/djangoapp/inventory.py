@@ -0,0 +1,296 @@
+"""
+Stock and reservation bookkeeping for orders.
+
+Product.reserved_quantity is the denormalized sum of quantities held by
+pending orders. All adjustments are single UPDATE statements using F()
+expressions, so concurrent checkouts and approvals never overwrite each
+other's changes. The drift repair, which writes absolute values, does so
+under a row lock.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from . import catalog_cache
+from .models import Product, Order
+
+
+class OrderAlreadyProcessed(Exception):
+    """The order is no longer pending - another request processed it first"""
+
+
+class InsufficientStock(Exception):
+    """Not enough stock to approve the order"""
+
+    def __init__(self, available):
+        super().__init__(f"Insufficient stock. Only {available} items available")
+        self.available = available
+
+
+def _per_product(quantities):
+    # CASE id WHEN ... THEN quantity END: each product's own quantity in one
+    # expression, so a whole cart or batch is adjusted with a single UPDATE
+    return Case(
+        *(When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()),
+        output_field=IntegerField(),
+    )
+
+
+def reserve_many(quantities):
+    """
+    Hold stock for the pending orders of one checkout, given as
+    {product_id: quantity}, with one UPDATE.
+    Each product is only reserved while its unreserved stock covers its
+    quantity; returns whether every product was. On False some products may
+    have been reserved, so the caller must roll back its transaction.
+    """
+    quantity = _per_product(quantities)
+    return Product.objects.filter(
+        pk__in=quantities, stock_quantity__gte=F('reserved_quantity') + quantity
+    ).update(
+        reserved_quantity=F('reserved_quantity') + quantity
+    ) == len(quantities)
+
+
+def reserve(product_id, quantity):
+    """
+    Hold stock for a newly created pending order.
+    Only succeeds while the unreserved stock covers the quantity; returns
+    whether the reservation was made.
+    """
+    return reserve_many({product_id: quantity})
+
+
+def release(product_id, quantity):
+    """Release stock held by a pending order that was approved or rejected"""
+    release_many({product_id: quantity})
+
+
+def release_many(quantities):
+    """release() for many products, {product_id: quantity}, with one UPDATE"""
+    quantity = _per_product(quantities)
+    Product.objects.filter(pk__in=quantities).update(
+        reserved_quantity=F('reserved_quantity') - quantity
+    )
+
+
+def _decrement_stock(product_id, quantity):
+    # Conditional decrement that also releases the matching reservation
+    return _decrement_stock_many({product_id: quantity})
+
+
+def _decrement_stock_many(quantities):
+    # _decrement_stock() for many products in one UPDATE; True only if every
+    # product had the stock, otherwise the caller must roll back
+    quantity = _per_product(quantities)
+    return Product.objects.filter(pk__in=quantities, stock_quantity__gte=quantity).update(
+        stock_quantity=F('stock_quantity') - quantity,
+        reserved_quantity=F('reserved_quantity') - quantity,
+    ) == len(quantities)
+
+
+class _Shortfall(Exception):
+    """Rolls back a grouped decrement that some product couldn't cover"""
+
+
+def _pending_total(product_id):
+    return Order.objects.filter(status='pending', product_id=product_id).aggregate(
+        total=Sum('quantity')
+    )['total'] or 0
+
+
+def recompute_reserved_quantities(dry_run=False):
+    """
+    Recompute reserved_quantity from pending orders and repair any drift.
+    Returns a list of (product_id, stored, actual) tuples for products that drifted.
+
+    Drift is first found with one aggregate over all pending orders. Each
+    drifted product is then repaired in its own transaction: its row is
+    locked, and its pending total is summed again before the write. A
+    checkout that committed in between is included, not overwritten.
+    """
+    actual = dict(
+        Order.objects.filter(status='pending')
+        .values_list('product')
+        .annotate(total=Sum('quantity'))
+    )
+
+    candidates = []
+    for product_id, stored in Product.objects.values_list('id', 'reserved_quantity').iterator():
+        expected = actual.get(product_id, 0)
+        if stored != expected:
+            candidates.append((product_id, stored, expected))
+
+    if dry_run:
+        return candidates
+
+    drifted = []
+    for product_id, _, _ in candidates:
+        with transaction.atomic():
+            stored = (
+                Product.objects.select_for_update().filter(pk=product_id)
+                .values_list('reserved_quantity', flat=True).first()
+            )
+            if stored is None:
+                continue
+            expected = _pending_total(product_id)
+            if stored != expected:
+                Product.objects.filter(pk=product_id).update(reserved_quantity=expected)
+                drifted.append((product_id, stored, expected))
+
+    return drifted
+
+
+def _claim(order, status, processed_by, notes):
+    # Move the order out of 'pending' only if nobody else has done so yet
+    processed_at = timezone.now()
+    claimed = Order.objects.filter(pk=order.pk, status='pending').update(
+        status=status, processed_by=processed_by, processed_at=processed_at, notes=notes
+    )
+    if not claimed:
+        raise OrderAlreadyProcessed()
+    order.status = status
+    order.processed_by = processed_by
+    order.processed_at = processed_at
+    order.notes = notes
+
+
+def approve_order(order, processed_by, notes=''):
+    """
+    Approve a pending order and take its quantity out of stock.
+
+    The status change and a conditional decrement
+    (UPDATE ... SET stock = stock - q WHERE stock >= q) run in one
+    transaction, so concurrent approvals can neither double-process an
+    order nor oversell a product.
+    Raises OrderAlreadyProcessed or InsufficientStock.
+    """
+    with transaction.atomic():
+        _claim(order, 'approved', processed_by, notes)
+        if not _decrement_stock(order.product_id, order.quantity):
+            available = Product.objects.filter(pk=order.product_id).values_list('stock_quantity', flat=True).first()
+            # Raising rolls back the status change made by _claim
+            raise InsufficientStock(available or 0)
+        # Queryset updates bypass the Product post_save signal
+        transaction.on_commit(partial(catalog_cache.invalidate_product, order.product_id))
+    return order
+
+
+def reject_order(order, processed_by, notes=''):
+    """
+    Reject a pending order and release its reservation.
+    Raises OrderAlreadyProcessed.
+    """
+    with transaction.atomic():
+        _claim(order, 'rejected', processed_by, notes)
+        release(order.product_id, order.quantity)
+    return order
+
+
+def bulk_process_orders(orders, action, processed_by, notes=''):
+    """
+    Approve or reject many pending orders in one transaction.
+
+    `orders` is a queryset selecting the candidate orders. Approvals apply
+    one conditional decrement covering every product; if some product cannot
+    cover all of its orders, each product is settled on its own instead: the
+    oldest orders that fit in the remaining stock are approved and the rest
+    are reported as insufficient_stock. Rejections release every product's
+    reservation with one UPDATE.
+
+    Returns a dict mapping order id to its outcome: 'approved', 'rejected',
+    'insufficient_stock' or 'not_pending'.
+    """
+    results = {}
+    with transaction.atomic():
+        candidates = list(
+            orders.select_for_update().order_by('id').values_list('id', 'product_id', 'quantity', 'status')
+        )
+        by_product = {}
+        for order_id, product_id, quantity, status in candidates:
+            if status != 'pending':
+                results[order_id] = 'not_pending'
+            else:
+                by_product.setdefault(product_id, []).append((order_id, quantity))
+
+        totals = {
+            product_id: sum(quantity for _, quantity in product_orders)
+            for product_id, product_orders in by_product.items()
+        }
+        processed_ids = []
+        if action == 'approve':
+            if _decrement_all(totals):
+                fitted = by_product
+            else:
+                # Some product can't cover all of its orders; settle each
+                # product on its own
+                fitted = {}
+                for product_id, product_orders in by_product.items():
+                    if _decrement_stock(product_id, totals[product_id]):
+                        fitted[product_id] = product_orders
+                    else:
+                        fitted[product_id] = _fit_orders_to_stock(product_id, product_orders)
+            for product_id, product_orders in by_product.items():
+                approved_ids = {order_id for order_id, _ in fitted[product_id]}
+                for order_id, _ in product_orders:
+                    results[order_id] = 'approved' if order_id in approved_ids else 'insufficient_stock'
+                processed_ids.extend(approved_ids)
+            status = 'approved'
+        else:
+            if totals:
+                release_many(totals)
+            for product_orders in by_product.values():
+                for order_id, _ in product_orders:
+                    results[order_id] = 'rejected'
+                    processed_ids.append(order_id)
+            status = 'rejected'
+
+        if processed_ids:
+            claimed = Order.objects.filter(pk__in=processed_ids, status='pending').update(
+                status=status, processed_by=processed_by, processed_at=timezone.now(), notes=notes
+            )
+            if claimed != len(processed_ids):
+                # Another request processed some of these orders concurrently
+                raise OrderAlreadyProcessed()
+
+        if action == 'approve' and by_product:
+            transaction.on_commit(partial(catalog_cache.invalidate_products, list(by_product)))
+    return results
+
+
+def _decrement_all(totals):
+    # One grouped decrement for every product, in a savepoint so that a
+    # product short of stock undoes the products that were decremented
+    if not totals:
+        return True
+    try:
+        with transaction.atomic():
+            if not _decrement_stock_many(totals):
+                raise _Shortfall()
+    except _Shortfall:
+        return False
+    return True
+
+
+def _fit_orders_to_stock(product_id, product_orders):
+    # Approve the oldest orders that fit in the current stock with a single
+    # decrement; fall back to one conditional decrement per order if the
+    # stock changed underneath us.
+    stock = (
+        Product.objects.select_for_update().filter(pk=product_id)
+        .values_list('stock_quantity', flat=True).first()
+    ) or 0
+    approved = []
+    remaining = stock
+    for order_id, quantity in product_orders:
+        if quantity <= remaining:
+            approved.append((order_id, quantity))
+            remaining -= quantity
+    if not approved or _decrement_stock(product_id, stock - remaining):
+        return approved
+    return [
+        (order_id, quantity) for order_id, quantity in product_orders
+        if _decrement_stock(product_id, quantity)
+    ]
@@ -0,0 +1,149 @@
+"""
+Durable background jobs stored in the database.
+
+enqueue() inserts a Job row for a task registered with @task, and workers
+started by `manage.py run_worker` call work() to claim and run due jobs.
+
+A worker claims a job with a conditional UPDATE that only succeeds if the
+row is still in the state it read, so concurrent workers never run the same
+claim twice and no row locks are needed (SQLite has none to offer). The
+claim leases the job until locked_until; a job whose worker dies mid-run
+becomes visible again once the lease expires. Jobs therefore run at least
+once, and task handlers must be safe to repeat.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Due jobs read per claim attempt; losing a race moves on to the next one
+CLAIM_CANDIDATES = 10
+
+# Task name -> handler, filled in by @task
+registry = {}
+
+
+def task(func):
+    """Register func as a background task, named after the function"""
+    registry[func.__name__] = func
+    return func
+
+
+def enqueue(task_name, payload=None, delay=0, max_attempts=None):
+    """
+    Queue task_name to run with payload as keyword arguments, at the
+    earliest delay seconds from now. Called inside a transaction, the job
+    only becomes visible to workers once that transaction commits.
+    """
+    if task_name not in registry:
+        raise ValueError(f"Unknown task {task_name!r}")
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a job that has failed attempts times"""
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+    # Jitter keeps jobs that failed together from retrying together
+    return delay * random.uniform(0.5, 1)
+
+
+def claim(worker_id, visibility_timeout=None):
+    """
+    Lease the oldest due job to worker_id and return it, or None if no job
+    is due. Due jobs are pending jobs past their run_after and running jobs
+    whose lease has expired.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT)
+    due = Q(status='pending', run_after__lte=now) | Q(status='running', locked_until__lt=now)
+    candidates = Job.objects.filter(due).order_by('run_after').values_list('pk', 'status', 'locked_until')
+
+    for pk, status, locked_until in candidates[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(pk=pk, status=status, locked_until=locked_until).update(
+            status='running', locked_by=worker_id, locked_until=now + lease, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _finish(job, **fields):
+    # Only the worker still holding the lease may record the outcome; if the
+    # lease expired and another worker reclaimed the job, this is a no-op
+    return Job.objects.filter(
+        pk=job.pk, status='running', locked_by=job.locked_by, attempts=job.attempts
+    ).update(locked_until=None, **fields)
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome. Returns whether it succeeded."""
+    now = timezone.now()
+    if job.attempts > job.max_attempts:
+        # Its worker kept dying mid-run until the attempts ran out
+        _finish(job, status='failed', finished_at=now, last_error='Lease expired on the final attempt')
+        return False
+
+    try:
+        handler = registry.get(job.task)
+        if handler is None:
+            raise LookupError(f"No handler registered for task {job.task!r}")
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            logger.error(f"{job} failed after {job.attempts} attempts:\n{error}")
+            _finish(job, status='failed', finished_at=now, last_error=error)
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning(f"{job} attempt {job.attempts} failed, retrying in {delay:.0f}s:\n{error}")
+            _finish(job, status='pending', run_after=now + timedelta(seconds=delay), last_error=error)
+        return False
+
+    _finish(job, status='succeeded', finished_at=timezone.now(), last_error='')
+    return True
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def work(stop, poll_interval=1.0, visibility_timeout=None, burst=False):
+    """
+    Claim and run jobs until the stop event is set, sleeping poll_interval
+    seconds whenever no job is due. With burst, return as soon as no job is
+    due instead. Returns the number of jobs run.
+    """
+    me = worker_id()
+    processed = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim(me, visibility_timeout)
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            run_job(job)
+            processed += 1
+    finally:
+        connection.close()
+    return processed
@@ -0,0 +1,171 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from djangoapp import restapis
+from djangoapp.microservices.sentiment_analyzer import vader_label
+from djangoapp.models import Review
+
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    VADER_AVAILABLE = True
+except ImportError:
+    VADER_AVAILABLE = False
+
+# The VADER analyzer of a pool worker process, built once by _init_vader
+_analyzer = None
+
+
+def _init_vader():
+    global _analyzer
+    _analyzer = SentimentIntensityAnalyzer()
+
+
+def score_locally(texts):
+    """Labels for texts, labelled by the sentiment service's own vader_label"""
+    return [vader_label(_analyzer.polarity_scores(text)['compound']) for text in texts]
+
+
+def score_with_service(texts):
+    """Labels for texts from the sentiment service, None where it failed"""
+    return [
+        result.get('label') if isinstance(result, dict) else None
+        for result in restapis.analyze_review_sentiments_batch(texts)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Score the sentiment of existing reviews in bulk, resumably'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=['local', 'service'], default='local',
+                            help='Score with VADER in a process pool (local, needs vaderSentiment) '
+                                 'or with batch calls to the sentiment service')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Scoring processes (local) or concurrent requests (service)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Reviews scored and written back per batch')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database at a time')
+        parser.add_argument('--after-id', type=int, default=0,
+                            help='Only score reviews with a higher id (resume point)')
+        parser.add_argument('--checkpoint',
+                            help='File holding the highest id written back; read on start and '
+                                 'updated after every batch, so a rerun resumes where this one stopped')
+        parser.add_argument('--only-neutral', action='store_true',
+                            help="Only rescore reviews still labelled 'neutral' (the placeholder)")
+        parser.add_argument('--progress-every', type=int, default=10,
+                            help='Report progress every N batches')
+
+    def handle(self, *args, **options):
+        backend = options['backend']
+        if backend == 'local' and not VADER_AVAILABLE:
+            raise CommandError('vaderSentiment is not installed; install it or use --backend service')
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1')
+
+        checkpoint = options['checkpoint']
+        after_id = max(options['after_id'], self.read_checkpoint(checkpoint))
+
+        reviews = Review.objects.filter(pk__gt=after_id)
+        if options['only_neutral']:
+            reviews = reviews.filter(sentiment='neutral')
+        total = reviews.count()
+        self.stdout.write(f'Scoring {total} reviews after id {after_id} with {backend} '
+                          f'({options["workers"]} workers, batches of {options["batch_size"]})')
+
+        if backend == 'local':
+            # Forked, so the workers need no Django setup of their own
+            executor = ProcessPoolExecutor(options['workers'], mp_context=multiprocessing.get_context('fork'),
+                                           initializer=_init_vader)
+            score = score_locally
+        else:
+            executor = ThreadPoolExecutor(options['workers'])
+            score = score_with_service
+
+        self.started = time.perf_counter()
+        self.scored = self.updated = self.batches_written = 0
+        high_water_mark = after_id
+        # Batches being scored, oldest first. At most two per worker are in
+        # flight, so memory stays flat however many reviews there are.
+        pending = deque()
+        rows = reviews.order_by('pk').values_list('pk', 'review_text', 'sentiment').iterator(
+            chunk_size=options['chunk_size']
+        )
+
+        with executor:
+            try:
+                for batch in self.batches(rows, options['batch_size']):
+                    pending.append((batch, executor.submit(score, [text for _, text, _ in batch])))
+                    if len(pending) >= 2 * options['workers']:
+                        high_water_mark = self.write_back(*pending.popleft(), high_water_mark, checkpoint)
+                        self.report(total, high_water_mark, options['progress_every'])
+                while pending:
+                    high_water_mark = self.write_back(*pending.popleft(), high_water_mark, checkpoint)
+                    self.report(total, high_water_mark, options['progress_every'])
+            except KeyboardInterrupt:
+                for _, future in pending:
+                    future.cancel()
+                raise CommandError(f'Interrupted; resume with --after-id {high_water_mark}')
+            finally:
+                # Release the database cursor before the connection goes away
+                rows.close()
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {self.scored} reviews ({self.updated} changed) in {elapsed:.1f}s, '
+            f'{self.scored / elapsed if elapsed else 0:,.0f} reviews/s; high-water mark {high_water_mark}'
+        ))
+
+    def batches(self, rows, size):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def write_back(self, batch, future, high_water_mark, checkpoint):
+        """Save a scored batch and advance the high-water mark past it"""
+        labels = future.result()
+        if any(label is None for label in labels):
+            raise CommandError(f'The sentiment service failed to score a batch; '
+                               f'resume with --after-id {high_water_mark}')
+
+        # Only rows whose label actually changes need writing
+        changed = [
+            Review(pk=pk, sentiment=label)
+            for (pk, _, sentiment), label in zip(batch, labels) if label != sentiment
+        ]
+        with transaction.atomic():
+            Review.objects.bulk_update(changed, ['sentiment'], batch_size=500)
+
+        high_water_mark = batch[-1][0]
+        if checkpoint:
+            with open(checkpoint, 'w') as f:
+                f.write(str(high_water_mark))
+        self.scored += len(batch)
+        self.updated += len(changed)
+        self.batches_written += 1
+        return high_water_mark
+
+    def report(self, total, high_water_mark, every):
+        if self.batches_written % every:
+            return
+        elapsed = time.perf_counter() - self.started
+        rate = self.scored / elapsed if elapsed else 0
+        remaining = (total - self.scored) / rate if rate else 0
+        self.stdout.write(f'{self.scored}/{total} reviews ({self.updated} changed), {rate:,.0f} reviews/s, '
+                          f'~{remaining:.0f}s left, high-water mark {high_water_mark}')
+
+    def read_checkpoint(self, path):
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return int(f.read().strip() or 0)
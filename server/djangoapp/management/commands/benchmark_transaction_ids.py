@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from djangoapp.ids import ULIDGenerator, SnowflakeGenerator
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark the transaction ID generators and check uniqueness and ordering'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=200000,
+            help='IDs to generate per generator (default: 200000)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=4,
+            help='Threads sharing one generator (default: 4)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        threads = options['threads']
+
+        self.stdout.write(f'{"Generator":<12} {"Mode":<14} {"IDs/sec":>12} {"Unique":>8} {"Sorted":>8}')
+        self.stdout.write('-' * 58)
+        for name, factory in (('ULID', ULIDGenerator), ('Snowflake', lambda: SnowflakeGenerator(worker_id=1))):
+            self._run(name, factory(), count, 1)
+            self._run(name, factory(), count, threads)
+
+    def _run(self, name, generator, count, threads):
+        per_thread = count // threads
+        batches = [[] for _ in range(threads)]
+
+        def work(batch):
+            generate = generator.generate
+            for _ in range(per_thread):
+                batch.append(generate())
+
+        workers = [threading.Thread(target=work, args=(batch,)) for batch in batches]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        ids = [generated for batch in batches for generated in batch]
+        unique = len(set(ids)) == len(ids)
+        # Each thread sees strictly increasing IDs
+        ordered = all(batch == sorted(batch) and len(set(batch)) == len(batch) for batch in batches)
+
+        mode = 'single thread' if threads == 1 else f'{threads} threads'
+        style = self.style.SUCCESS if unique and ordered else self.style.ERROR
+        self.stdout.write(style(
+            f'{name:<12} {mode:<14} {len(ids) / elapsed:>12,.0f} {str(unique):>8} {str(ordered):>8}'
+        ))
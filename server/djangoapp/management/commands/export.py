@@ -0,0 +1,55 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from djangoapp import exports
+
+
+class Command(BaseCommand):
+    help = 'Export orders, tickets or reviews as CSV or NDJSON, streamed in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(exports.EXPORTS), help='Table to export')
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='csv', help='Output format')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--level', type=int, default=exports.GZIP_LEVEL,
+                            help='gzip compression level, 1 (fastest) to 9 (smallest)')
+        parser.add_argument('--since', help='First day to include, YYYY-MM-DD')
+        parser.add_argument('--until', help='Last day to include, YYYY-MM-DD')
+        parser.add_argument('--status', action='append', default=[],
+                            help='Only rows with this status (repeatable, or comma-separated)')
+        parser.add_argument('--output', '-o', default='-',
+                            help='File to write (default: stdout; progress goes to stderr)')
+
+    def handle(self, *args, **options):
+        table = options['table']
+        statuses = [status for value in options['status'] for status in value.split(',') if status]
+        try:
+            rows = exports.queryset(
+                table,
+                since=exports.parse_day(options['since'], '--since'),
+                until=exports.parse_day(options['until'], '--until'),
+                statuses=statuses,
+            )
+            chunks = exports.stream(rows, table, options['format'], options['gzip'], options['level'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        started = time.perf_counter()
+        written = 0
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+            else:
+                output.flush()
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {table} ({written / 1e6:.1f} MB) in {elapsed:.1f}s, '
+            f'{written / 1e6 / elapsed if elapsed else 0:.1f} MB/s'
+        ))
@@ -1,8 +1,9 @@
 import csv
 import os
+import random
 from django.core.management.base import BaseCommand
-from django.db import transaction
 from djangoapp.models import Product
+from djangoapp.product_import import IMPORT_BATCH_SIZE, upsert_products
 
 
 class Command(BaseCommand):
@@ -19,6 +20,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing products before loading new ones',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Rows imported per transaction (default: {IMPORT_BATCH_SIZE})',
+        )
 
     def handle(self, *args, **options):
         # Default CSV path
@@ -42,78 +49,19 @@ class Command(BaseCommand):
                 self.style.WARNING('Cleared all existing products')
             )
 
-        # Load products from CSV
-        products_created = 0
-        products_updated = 0
-        
+        # Load products from CSV, upserting them a batch at a time
         with open(csv_path, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
-            
-            with transaction.atomic():
-                for row in reader:
-                    # Clean and parse price
-                    price_str = row.get('Price', '0').replace('CA$', '').replace('$', '').replace(',', '').strip()
-                    try:
-                        price = float(price_str)
-                    except ValueError:
-                        price = 0.0
-                    
-                    # Generate description based on CSV data
-                    brand = row.get('Brand', '').strip()
-                    # Handle BOM in the first column
-                    category = row.get('Category', row.get('\ufeffCategory', '')).strip()
-                    subcategory = row.get('Subcategory', '').strip()
-                    subcategory2 = row.get('Subcategory2', '').strip()
-                    product_name = row.get('Product name', '').strip()
-                    
-                    # Create a meaningful description
-                    description_parts = []
-                    if brand:
-                        description_parts.append(f"High-quality {brand}")
-                    if subcategory and subcategory != category:
-                        description_parts.append(subcategory.lower())
-                    if subcategory2 and subcategory2 != subcategory:
-                        description_parts.append(subcategory2.lower())
-                    if category:
-                        description_parts.append(f"in the {category.lower()} category")
-                    
-                    if description_parts:
-                        description = " ".join(description_parts) + "."
-                    else:
-                        description = f"Quality {product_name.lower()} product."
-                    
-                    # Extract brand from product name if brand field is empty
-                    if not brand and product_name:
-                        # Try to extract brand from product name
-                        words = product_name.split()
-                        if len(words) > 0:
-                            brand = words[0]
-                    
-                    # Generate stock quantity (random but realistic)
-                    import random
-                    stock_quantity = random.randint(5, 200)
-                    
-                    # Create or update product
-                    product, created = Product.objects.update_or_create(
-                        name=product_name,
-                        defaults={
-                            'category': category,
-                            'price': price,
-                            'description': description,
-                            'stock_quantity': stock_quantity,
-                            'image_url': row.get('Image Url', '').strip(),
-                            'is_active': True,
-                        }
-                    )
-                    
-                    if created:
-                        products_created += 1
-                    else:
-                        products_updated += 1
+            stats = upsert_products(
+                self.product_rows(reader),
+                batch_size=options['batch_size'],
+                progress=lambda stats: self.stdout.write(str(stats)),
+            )
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully loaded {products_created} new products and updated {products_updated} existing products'
+                f'Successfully loaded {stats.created} new products and updated {stats.updated} existing products '
+                f'({stats.unchanged} unchanged) in {stats.seconds:.2f}s, {stats.rows_per_second:,.0f} rows/s'
             )
         )
         
@@ -122,3 +70,55 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f'Total products in database: {total_products}')
         )
+
+    def product_rows(self, reader):
+        """Product fields for each CSV row"""
+        for row in reader:
+            # Clean and parse price
+            price_str = row.get('Price', '0').replace('CA$', '').replace('$', '').replace(',', '').strip()
+            try:
+                price = float(price_str)
+            except ValueError:
+                price = 0.0
+            
+            # Generate description based on CSV data
+            brand = row.get('Brand', '').strip()
+            # Handle BOM in the first column
+            category = row.get('Category', row.get('\ufeffCategory', '')).strip()
+            subcategory = row.get('Subcategory', '').strip()
+            subcategory2 = row.get('Subcategory2', '').strip()
+            product_name = row.get('Product name', '').strip()
+            
+            # Create a meaningful description
+            description_parts = []
+            if brand:
+                description_parts.append(f"High-quality {brand}")
+            if subcategory and subcategory != category:
+                description_parts.append(subcategory.lower())
+            if subcategory2 and subcategory2 != subcategory:
+                description_parts.append(subcategory2.lower())
+            if category:
+                description_parts.append(f"in the {category.lower()} category")
+            
+            if description_parts:
+                description = " ".join(description_parts) + "."
+            else:
+                description = f"Quality {product_name.lower()} product."
+            
+            # Extract brand from product name if brand field is empty
+            if not brand and product_name:
+                # Try to extract brand from product name
+                words = product_name.split()
+                if len(words) > 0:
+                    brand = words[0]
+            
+            yield {
+                'name': product_name,
+                'category': category,
+                'price': price,
+                'description': description,
+                # Only used for new products; existing stock is left alone
+                'stock_quantity': random.randint(5, 200),
+                'image_url': row.get('Image Url', '').strip(),
+                'is_active': True,
+            }
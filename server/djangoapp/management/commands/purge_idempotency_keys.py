@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from djangoapp.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete Idempotency-Key records older than IDEMPOTENCY_KEY_TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count expired keys without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        expired = IdempotencyKey.objects.filter(created_at__lt=IdempotencyKey.expiry_cutoff())
+
+        if options.get('dry_run'):
+            self.stdout.write(self.style.WARNING(f'{expired.count()} expired idempotency keys (dry run, nothing deleted)'))
+            return
+
+        deleted, _ = expired.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
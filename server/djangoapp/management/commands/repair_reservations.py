@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from djangoapp.inventory import recompute_reserved_quantities
+
+
+class Command(BaseCommand):
+    help = 'Recompute Product.reserved_quantity from pending orders and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted products without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run')
+        drifted = recompute_reserved_quantities(dry_run=dry_run)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All reservation counters are in sync'))
+            return
+
+        for product_id, stored, expected in drifted:
+            self.stdout.write(f'Product {product_id}: stored {stored}, pending orders hold {expected}')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} products have drifted (dry run, nothing changed)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drifted)} products'))
@@ -0,0 +1,82 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
+from djangoapp import jobs
+
+
+def run_threads(count, options):
+    """Run count worker threads in this process until SIGTERM/SIGINT"""
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+
+    processed = [0] * count
+
+    def target(index):
+        processed[index] = jobs.work(
+            stop,
+            poll_interval=options['poll_interval'],
+            visibility_timeout=options['visibility_timeout'],
+            burst=options['burst'],
+        )
+
+    threads = [threading.Thread(target=target, args=(i,), name=f'worker-{i}') for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(processed)
+
+
+def run_process(count, options):
+    processed = run_threads(count, options)
+    print(f'Worker process finished after {processed} jobs', flush=True)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1, help='Worker threads per process')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when no job is due')
+        parser.add_argument('--visibility-timeout', type=int, default=settings.JOB_VISIBILITY_TIMEOUT,
+                            help='Seconds a claimed job stays leased to its worker')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due instead of polling')
+
+    def handle(self, *args, **options):
+        threads, processes = options['threads'], options['processes']
+        if threads < 1 or processes < 1:
+            raise CommandError('--threads and --processes must be at least 1')
+
+        self.stdout.write(f'Starting {processes} worker process(es) x {threads} thread(s), '
+                          f'tasks: {", ".join(sorted(jobs.registry))}')
+
+        if processes == 1:
+            processed = run_threads(threads, options)
+            self.stdout.write(self.style.SUCCESS(f'Worker finished after {processed} jobs'))
+            return
+
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [context.Process(target=run_process, args=(threads, options)) for _ in range(processes)]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, forward)
+
+        for child in children:
+            child.join()
+        self.stdout.write(self.style.SUCCESS('All worker processes finished'))
@@ -1,9 +1,24 @@
+import json
 import os
-from flask import Flask, request, jsonify
-from sentiment_analyzer import sentiment_analyzer
+import threading
+from flask import Flask, Response, request, jsonify
+from sentiment_analyzer import (
+    sentiment_analyzer, sentiment_analyzer_batch, result_cache, warm_up, warm_up_state, watsonx_configured,
+)
 
 app = Flask("SentimentAnalyzer")
 
+# Load the VADER lexicon when the process (each gunicorn worker) starts rather
+# than on the first request. It runs in the background so the worker can bind
+# right away; /healthz reports 503 until it is done.
+WARM_UP = os.environ.get("SENTIMENT_WARM_UP", "True").lower() == "true"
+if WARM_UP:
+    threading.Thread(target=warm_up, name="sentiment-warm-up", daemon=True).start()
+
+# Most texts accepted by one /analyze/batch request
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 1000))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson")
+
 @app.route("/", methods=["GET"])
 def home():
     port = os.environ.get("PORT", 5002)
@@ -16,6 +31,59 @@ def analyze(text):
         return jsonify({"error": "Invalid input"}), 400
     return jsonify(result)
 
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    ready = warm_up_state["ready"] or not WARM_UP
+    body = {
+        "status": "ok" if ready else "warming_up",
+        "warmed_up": warm_up_state["ready"],
+        "warm_up_seconds": warm_up_state["seconds"],
+        "watsonx": watsonx_configured(),
+        "pid": os.getpid(),
+    }
+    return jsonify(body), 200 if ready else 503
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({"cache": result_cache.stats()})
+
+def batch_result(result):
+    if result['label'] is None:
+        return {"label": None, "score": None, "error": result.get("error", "Invalid input")}
+    return {"label": result['label'], "score": result['score']}
+
+def read_batch():
+    """
+    Texts of a batch request: a JSON array, or NDJSON with one JSON value
+    per line. Items are strings or objects with a "text" field.
+    """
+    if request.mimetype in NDJSON_TYPES:
+        items = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+    else:
+        items = json.loads(request.get_data(as_text=True))
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of texts")
+
+    texts = [item.get("text") if isinstance(item, dict) else item for item in items]
+    if not all(isinstance(text, str) for text in texts):
+        raise ValueError("Every item must be a string or an object with a text field")
+    return texts
+
+@app.route("/analyze/batch", methods=["POST"])
+def analyze_batch():
+    try:
+        texts = read_batch()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(texts) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} texts per batch"}), 413
+
+    results = (batch_result(result) for result in sentiment_analyzer_batch(texts))
+    if request.mimetype in NDJSON_TYPES:
+        # Stream one result per line, in input order
+        return Response((json.dumps(result) + "\n" for result in results), mimetype="application/x-ndjson")
+    return jsonify({"results": list(results)})
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5002))
     print(f"Starting Flask app on port {port}...")
@@ -0,0 +1,79 @@
+"""
+Throughput benchmark for the VADER sentiment path.
+
+Builds a corpus from the review texts in database/data/reviews.json, with
+each text varied so that roughly --unique of the corpus is distinct. Then it
+measures texts per second for:
+
+    new analyzer   a SentimentIntensityAnalyzer built per call (the old code)
+    shared         the process-wide analyzer, without the result cache
+    shared+cache   sentiment_analyzer(), with the result cache
+
+Watsonx credentials are ignored so every run measures VADER.
+
+Usage:
+    python benchmark_sentiment.py [--texts 20000] [--unique 0.2] [--corpus PATH]
+"""
+
+import argparse
+import json
+import os
+import time
+
+for variable in ("WATSONX_API_KEY", "WATSONX_PROJECT_ID", "SERVER_URL"):
+    os.environ.pop(variable, None)
+
+import sentiment_analyzer as sa  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', '..', 'database', 'data', 'reviews.json')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark VADER sentiment throughput")
+    parser.add_argument('--texts', type=int, default=20000, help='Texts to analyze per run')
+    parser.add_argument('--unique', type=float, default=0.2, help='Fraction of distinct texts in the corpus')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='reviews.json to draw texts from')
+    parser.add_argument('--baseline-texts', type=int, default=300,
+                        help='Texts for the slow new-analyzer-per-call run')
+    return parser.parse_args()
+
+
+def build_corpus(path, count, unique):
+    with open(path) as f:
+        reviews = [review['review'] for review in json.load(f)['reviews']]
+    distinct = max(1, int(count * unique))
+    # Suffixing a number keeps the sentiment realistic but the text distinct
+    return [f"{reviews[i % len(reviews)]} #{i % distinct}" for i in range(count)]
+
+
+def measure(name, analyze, texts):
+    started = time.perf_counter()
+    for text in texts:
+        analyze(text)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<14} {len(texts):>8} {len(texts) / elapsed:>14,.0f}")
+    return len(texts) / elapsed
+
+
+def new_analyzer_per_call(text):
+    return sa.SentimentIntensityAnalyzer().polarity_scores(text)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not sa.VADER_AVAILABLE:
+        raise SystemExit("vaderSentiment is not installed")
+    texts = build_corpus(args.corpus, args.texts, args.unique)
+
+    print(f"{'Mode':<14} {'Texts':>8} {'Texts/sec':>14}")
+    baseline = measure('new analyzer', new_analyzer_per_call, texts[:args.baseline_texts])
+
+    sa.warm_up()
+    shared = measure('shared', sa.sentiment_analyzer_vader, texts)
+
+    sa.result_cache.clear()
+    cached = measure('shared+cache', sa.sentiment_analyzer, texts)
+
+    print(f"\nshared is {shared / baseline:.0f}x the old path, shared+cache {cached / baseline:.0f}x")
+    print(f"cache: {sa.result_cache.stats()}")
@@ -0,0 +1,15 @@
+# Production server settings for the sentiment service:
+#
+#     gunicorn --config gunicorn.conf.py app:app
+#
+# Every worker imports app.py itself (no preload_app) and warms up its own
+# VADER analyzer; /healthz answers 503 until that is done.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5002)}"
+workers = int(os.environ.get("SENTIMENT_WORKERS", 2))
+# Threads let a worker overlap Watsonx calls; VADER itself is CPU-bound
+threads = int(os.environ.get("SENTIMENT_THREADS", 4))
+timeout = int(os.environ.get("SENTIMENT_TIMEOUT", 60))
+keepalive = 5
+accesslog = os.environ.get("SENTIMENT_ACCESS_LOG") or None
@@ -0,0 +1,151 @@
+"""
+Load test for the sentiment service.
+
+Drives GET /analyze/<text> and POST /analyze/batch with concurrent client
+threads for a fixed time, and reports requests per second, texts per
+second and p50/p95 latency for each endpoint. Texts come from
+database/data/reviews.json.
+
+Either point it at a running service with --url, or pass --start to launch
+gunicorn with gunicorn.conf.py (and --workers/--threads) on a free port.
+
+Usage:
+    python load_test.py --start [--workers 2] [--threads 4]
+    python load_test.py --url http://localhost:5002 [--concurrency 16]
+                        [--seconds 10] [--batch-size 100]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(HERE, '..', '..', 'database', 'data', 'reviews.json')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the sentiment service")
+    parser.add_argument('--url', help='Base URL of a running sentiment service')
+    parser.add_argument('--start', action='store_true', help='Start gunicorn locally for the test')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers with --start')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker with --start')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client threads')
+    parser.add_argument('--seconds', type=float, default=10, help='Duration per endpoint')
+    parser.add_argument('--batch-size', type=int, default=100, help='Texts per batch request')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='reviews.json to draw texts from')
+    args = parser.parse_args()
+    if not args.url and not args.start:
+        parser.error('pass --url or --start')
+    return args
+
+
+def load_texts(path):
+    with open(path) as f:
+        reviews = [review['review'] for review in json.load(f)['reviews']]
+    # Distinct texts so the result cache doesn't turn this into a cache benchmark
+    return [f"{reviews[i % len(reviews)]} ({i})" for i in range(100000)]
+
+
+def start_gunicorn(workers, threads):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, PORT=str(port), SENTIMENT_WORKERS=str(workers), SENTIMENT_THREADS=str(threads))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return process, f'http://127.0.0.1:{port}'
+
+
+def wait_until_healthy(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = requests.get(f'{base_url}/healthz', timeout=2)
+            if response.status_code == 200:
+                return response.json()
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'{base_url}/healthz did not report ready')
+
+
+def run(name, send, texts_per_request, args):
+    latencies = []
+    errors = 0
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker():
+        nonlocal errors
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            with lock:
+                n = next(counter)
+            started = time.perf_counter()
+            try:
+                ok = send(session, n)
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += 0 if ok else 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(f"{name:<8} {len(latencies) / elapsed:>10,.1f} {len(latencies) * texts_per_request / elapsed:>10,.0f} "
+          f"{p50 * 1000:>9.1f} {p95 * 1000:>9.1f} {errors:>7}")
+
+
+def main():
+    args = parse_args()
+    texts = load_texts(args.corpus)
+    process = None
+    base_url = args.url.rstrip('/') if args.url else None
+    if args.start:
+        process, base_url = start_gunicorn(args.workers, args.threads)
+    try:
+        health = wait_until_healthy(base_url)
+        print(f"{base_url}: {health}")
+        print(f"{args.concurrency} client threads, {args.seconds:.0f}s per endpoint, batches of {args.batch_size}")
+        print(f"{'Endpoint':<8} {'req/s':>10} {'texts/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+
+        def single(session, n):
+            text = urllib.parse.quote(texts[n % len(texts)], safe='')
+            return session.get(f'{base_url}/analyze/{text}', timeout=30).status_code == 200
+
+        def batch(session, n):
+            start = (n * args.batch_size) % (len(texts) - args.batch_size)
+            response = session.post(f'{base_url}/analyze/batch', json=texts[start:start + args.batch_size], timeout=60)
+            return response.status_code == 200 and len(response.json()['results']) == args.batch_size
+
+        run('single', single, 1, args)
+        run('batch', batch, args.batch_size, args)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import requests
-import json
+import hashlib
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Try to use VADER sentiment analysis as fallback
@@ -12,9 +17,101 @@ except ImportError:
 
 load_dotenv()
 
-def get_access_token(api_key):
-    """Get access token from IBM Cloud IAM"""
-    iam_url = "https://iam.cloud.ibm.com/identity/token"
+# Concurrent requests a batch may have open against Watsonx
+WATSONX_MAX_CONCURRENCY = int(os.getenv("WATSONX_MAX_CONCURRENCY", 8))
+# IBM Cloud IAM token endpoint, and seconds before expiry to refresh a token
+IAM_URL = os.getenv("IAM_URL", "https://iam.cloud.ibm.com/identity/token")
+IAM_REFRESH_MARGIN = float(os.getenv("IAM_REFRESH_MARGIN", 300))
+# Results kept by the sentiment cache, and seconds each stays valid
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", 10000))
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL", 3600))
+# Seconds a VADER fallback result stays cached while Watsonx is configured
+# but failing, so labels go back to Watsonx soon after it recovers
+SENTIMENT_FALLBACK_CACHE_TTL = float(os.getenv("SENTIMENT_FALLBACK_CACHE_TTL", 60))
+
+_WHITESPACE = re.compile(r"\s+")
+
+class ResultCache:
+    """Thread-safe LRU cache with a TTL and hit-rate counters"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() <= entry[0]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Cache value for ttl seconds, or the cache's default TTL"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+result_cache = ResultCache(SENTIMENT_CACHE_SIZE, SENTIMENT_CACHE_TTL)
+
+_vader_analyzer = None
+_vader_lock = threading.Lock()
+
+def get_vader_analyzer():
+    """The process-wide VADER analyzer, loading the lexicon on first use"""
+    global _vader_analyzer
+    if _vader_analyzer is None:
+        with _vader_lock:
+            if _vader_analyzer is None:
+                _vader_analyzer = SentimentIntensityAnalyzer()
+    return _vader_analyzer
+
+# Reported by the Flask /healthz endpoint
+warm_up_state = {"ready": False, "seconds": None}
+
+def warm_up():
+    """Load the VADER lexicon now rather than on the first request"""
+    started = time.perf_counter()
+    if VADER_AVAILABLE:
+        get_vader_analyzer().polarity_scores("warm up")
+    warm_up_state["seconds"] = round(time.perf_counter() - started, 3)
+    warm_up_state["ready"] = True
+
+def cache_key(text):
+    # VADER splits on whitespace, so collapsing it never changes the result.
+    # Case is kept: VADER scores capitalized words more strongly.
+    normalized = _WHITESPACE.sub(" ", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def fetch_access_token(api_key):
+    """Request a new access token from IBM Cloud IAM, returning (token, expires_in) or None"""
     headers = {
         "Content-Type": "application/x-www-form-urlencoded"
     }
@@ -24,50 +121,141 @@ def get_access_token(api_key):
     }
     
     try:
-        response = requests.post(iam_url, headers=headers, data=data, timeout=10)
+        response = requests.post(IAM_URL, headers=headers, data=data, timeout=10)
         if response.status_code == 200:
-            return response.json().get("access_token")
+            body = response.json()
+            return body.get("access_token"), float(body.get("expires_in", 3600))
         else:
             return None
-    except requests.exceptions.RequestException:
+    except (requests.exceptions.RequestException, ValueError):
         return None
 
+class TokenCache:
+    """
+    Caches IAM access tokens per API key until shortly before they expire.
+
+    Within `refresh_margin` seconds of expiry one caller refreshes the token
+    while the others keep using the current one. Once a token has expired
+    (or before the first one), callers wait for a single in-flight refresh
+    instead of all calling IAM.
+    """
+
+    def __init__(self, fetch, refresh_margin):
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._refresh_lock = threading.Lock()
+        self.fetches = 0
+
+    def _valid(self, api_key, fresh=False):
+        # fresh: valid and not yet due for a refresh
+        token, refresh_at, expires_at = self._tokens.get(api_key, (None, 0, 0))
+        return token if token and time.monotonic() < (refresh_at if fresh else expires_at) else None
+
+    def get(self, api_key):
+        token = self._valid(api_key, fresh=True)
+        if token:
+            return token
+
+        still_valid = self._valid(api_key)
+        # While the token still works, one caller refreshes and the rest carry on
+        if not self._refresh_lock.acquire(blocking=still_valid is None):
+            return still_valid
+        try:
+            # Another caller may have refreshed while we waited for the lock
+            token = self._valid(api_key, fresh=True)
+            if token:
+                return token
+            self.fetches += 1
+            fetched = self._fetch(api_key)
+            if not fetched or not fetched[0]:
+                # Keep using the current token until it actually expires
+                return self._valid(api_key)
+            token, expires_in = fetched
+            now = time.monotonic()
+            # Short-lived tokens are refreshed halfway through their lifetime
+            refresh_in = max(expires_in - self.refresh_margin, expires_in / 2)
+            self._tokens[api_key] = (token, now + refresh_in, now + expires_in)
+            return token
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self, api_key):
+        self._tokens.pop(api_key, None)
+
+    def clear(self):
+        with self._refresh_lock:
+            self._tokens.clear()
+            self.fetches = 0
+
+token_cache = TokenCache(fetch_access_token, IAM_REFRESH_MARGIN)
+
+def get_access_token(api_key):
+    """Get a cached access token from IBM Cloud IAM, refreshing it when needed"""
+    return token_cache.get(api_key)
+
+# VADER compound scores at or above / at or below these are positive /
+# negative, anything in between neutral. Also used by the Django
+# backfill_sentiment command, so backfilled labels match live ones.
+VADER_POSITIVE_THRESHOLD = 0.05
+VADER_NEGATIVE_THRESHOLD = -0.05
+
+def vader_label(compound):
+    """The sentiment label of a VADER compound score"""
+    if compound >= VADER_POSITIVE_THRESHOLD:
+        return "positive"
+    if compound <= VADER_NEGATIVE_THRESHOLD:
+        return "negative"
+    return "neutral"
+
 def sentiment_analyzer_vader(text_to_analyze):
     """Fallback sentiment analysis using VADER"""
     if not VADER_AVAILABLE:
         return {"label": None, "score": None, "error": "VADER sentiment analyzer not available"}
     
-    analyzer = SentimentIntensityAnalyzer()
-    scores = analyzer.polarity_scores(text_to_analyze)
+    scores = get_vader_analyzer().polarity_scores(text_to_analyze)
     
     # Determine sentiment based on compound score
     compound = scores['compound']
-    if compound >= 0.05:
-        label = "positive"
-        score = compound
-    elif compound <= -0.05:
-        label = "negative"
-        score = abs(compound)
-    else:
-        label = "neutral"
-        score = 0.5
+    label = vader_label(compound)
+    score = 0.5 if label == "neutral" else abs(compound)
     
     return {"label": label, "score": round(score, 2)}
 
 def sentiment_analyzer(text_to_analyze):
+    """Analyze a text, serving repeated texts from the result cache"""
+    key = cache_key(text_to_analyze)
+    result = result_cache.get(key)
+    if result is None:
+        result, degraded = analyze_uncached(text_to_analyze)
+        if result.get("label") is not None:
+            # Fallback labels are only kept briefly, not for the full TTL
+            result_cache.set(key, result, SENTIMENT_FALLBACK_CACHE_TTL if degraded else None)
+    return dict(result)
+
+def analyze_uncached(text_to_analyze):
+    """
+    Analyze a text with Watsonx, or with VADER when Watsonx isn't configured.
+    Returns (result, degraded); degraded is True when Watsonx is configured
+    but failed and VADER answered instead.
+    """
+    if not watsonx_configured():
+        return sentiment_analyzer_vader(text_to_analyze), False
+    result = analyze_watsonx(text_to_analyze)
+    if result is None:
+        return sentiment_analyzer_vader(text_to_analyze), True
+    return result, False
+
+def analyze_watsonx(text_to_analyze):
+    """Watsonx's label for a text, or None if the call or its answer failed"""
     api_key = os.getenv("WATSONX_API_KEY")
     project_id = os.getenv("WATSONX_PROJECT_ID")
     server_url = os.getenv("SERVER_URL")
 
-    # If Watson X credentials are not available, use VADER as fallback
-    if not api_key or not project_id or not server_url:
-        return sentiment_analyzer_vader(text_to_analyze)
-
     # Get access token
     access_token = get_access_token(api_key)
     if not access_token:
-        # Fallback to VADER if authentication fails
-        return sentiment_analyzer_vader(text_to_analyze)
+        return None
 
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -88,9 +276,11 @@ def sentiment_analyzer(text_to_analyze):
 
     try:
         response = requests.post(server_url, headers=headers, json=payload, timeout=30)
+        if response.status_code == 401:
+            # Revoked token, fetch a new one next time
+            token_cache.invalidate(api_key)
         if response.status_code != 200:
-            # Fallback to VADER if Watson X fails
-            return sentiment_analyzer_vader(text_to_analyze)
+            return None
         
         result = response.json()
         
@@ -106,9 +296,26 @@ def sentiment_analyzer(text_to_analyze):
             elif "neutral" in generated_text:
                 return {"label": "neutral", "score": 0.5}
             else:
-                return sentiment_analyzer_vader(text_to_analyze)
+                return None
         else:
-            return sentiment_analyzer_vader(text_to_analyze)
+            return None
             
-    except requests.exceptions.RequestException:
-        return sentiment_analyzer_vader(text_to_analyze)
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+def watsonx_configured():
+    return bool(os.getenv("WATSONX_API_KEY") and os.getenv("WATSONX_PROJECT_ID") and os.getenv("SERVER_URL"))
+
+def sentiment_analyzer_batch(texts):
+    """
+    Analyze a list of texts in one pass, yielding one result per text in
+    input order as soon as it is ready.
+    """
+    if not watsonx_configured():
+        # VADER is CPU-bound, threads would not speed it up
+        for text in texts:
+            yield sentiment_analyzer(text)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(WATSONX_MAX_CONCURRENCY, max(len(texts), 1))) as executor:
+        yield from executor.map(sentiment_analyzer, texts)
@@ -0,0 +1,132 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .querycount import QueryRecorder, DEFAULT_REPEAT_THRESHOLD
+from .roles import get_user_role
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCountMiddleware:
+    """
+    Count and fingerprint the SQL run by each request.
+
+    Active when DEBUG or QUERY_COUNT_ENABLED is set. Adds X-Query-Count,
+    X-Query-Time-Ms and X-Query-Repeats headers in DEBUG mode (except on
+    streamed responses, whose queries run after the headers are sent), logs
+    repeated query shapes as N+1 suspects, and checks the per-view budgets in
+    QUERY_BUDGETS ({view_name: max_queries}). With QUERY_BUDGET_STRICT a
+    blown budget raises instead of logging, so it fails loudly in tests.
+    Async-capable, so async views aren't forced back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG or getattr(settings, 'QUERY_COUNT_ENABLED', False)):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        self.repeat_threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        with recorder.capture():
+            response = self.get_response(request)
+        return self.finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        # Execute wrappers are per thread. An async request runs its queries
+        # on the thread that sync_to_async hands it, so hook that thread's
+        # connections rather than the event loop's.
+        capture = recorder.capture()
+        await sync_to_async(capture.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+        return self.finish(request, response, recorder)
+
+    def finish(self, request, response, recorder):
+        """Run the checks and add the debug headers once the view has returned"""
+        view_name = request.resolver_match.view_name if request.resolver_match else request.path
+        if response.streaming:
+            # A streamed body runs its queries while it is being sent, after
+            # this returns, so keep recording until the stream is exhausted.
+            # Headers are already gone by then, so only the checks apply.
+            record = self.arecord_stream if response.is_async else self.record_stream
+            response.streaming_content = record(response.streaming_content, recorder, view_name)
+            return response
+
+        repeated = self.check(recorder, view_name)
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = f"{recorder.duration * 1000:.1f}"
+            response['X-Query-Repeats'] = str(sum(repeated.values()))
+        return response
+
+    def record_stream(self, content, recorder, view_name):
+        with recorder.capture():
+            yield from content
+        self.check(recorder, view_name)
+
+    async def arecord_stream(self, content, recorder, view_name):
+        # The pieces of an async stream are produced on the request's sync
+        # thread (see streaming.streaming_response), so record there
+        capture = recorder.capture()
+        await sync_to_async(capture.__enter__)()
+        try:
+            async for part in content:
+                yield part
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+        self.check(recorder, view_name)
+
+    def check(self, recorder, view_name):
+        """Log N+1 suspects and enforce the view's budget; returns the repeated shapes"""
+        repeated = recorder.repeated(self.repeat_threshold)
+        for shape, count in repeated.items():
+            logger.warning(f"Possible N+1 in {view_name}: {count}x {shape}")
+
+        budget = self.budgets.get(view_name)
+        if budget is not None and recorder.count > budget:
+            message = f"{view_name} ran {recorder.count} queries, budget is {budget}"
+            if self.strict:
+                raise AssertionError(message)
+            logger.error(message)
+        return repeated
+
+
+class RoleMiddleware:
+    """
+    Resolve the user's role once per request as request.user_role.
+    Must come after AuthenticationMiddleware. The profile is loaded with the
+    user (djangoapp.backends.ProfileBackend), so this adds no query.
+    Async-capable, so async views aren't forced back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.user_role = get_user_role(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.user_role = await sync_to_async(get_user_role)(request)
+        return await self.get_response(request)
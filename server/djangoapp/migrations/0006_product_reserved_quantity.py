@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:04
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_reserved_quantity(apps, schema_editor):
+    Product = apps.get_model('djangoapp', 'Product')
+    Order = apps.get_model('djangoapp', 'Order')
+    pending = (
+        Order.objects.filter(status='pending')
+        .values_list('product')
+        .annotate(total=Sum('quantity'))
+    )
+    for product_id, total in pending:
+        Product.objects.filter(pk=product_id).update(reserved_quantity=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0005_product_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved_quantity',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_reserved_quantity, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
@@ -22,14 +26,34 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField()
     stock_quantity = models.IntegerField(default=0)
+    # Quantity held by pending orders; maintained by djangoapp.inventory
+    reserved_quantity = models.IntegerField(default=0)
     image_url = models.URLField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Indexes backing the keyset-paginated catalog listing, which always
+        # filters on is_active and orders by (name, id). Partial indexes are
+        # used because a boolean filter compiles to a bare "WHERE is_active",
+        # which SQLite can match against an index condition but not use as
+        # an equality prefix of a composite index.
+        indexes = [
+            models.Index(fields=['name', 'id'], condition=models.Q(is_active=True), name='product_active_name_idx'),
+            models.Index(fields=['category', 'name', 'id'], condition=models.Q(is_active=True), name='product_active_cat_name_idx'),
+            # Bulk import matching products by name, active or not
+            models.Index(fields=['name'], name='product_name_idx'),
+        ]
+
     @property
     def is_in_stock(self):
         return self.stock_quantity > 0
 
+    @property
+    def available_quantity(self):
+        # Stock not already claimed by pending orders
+        return self.stock_quantity - self.reserved_quantity
+
     def __str__(self):
         return f"{self.name} - {self.category}"
 
@@ -46,13 +70,23 @@ class Order(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=1)
     date_purchased = models.DateField()
-    transaction_id = models.CharField(max_length=100)
+    transaction_id = models.CharField(max_length=100, db_index=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     processed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='processed_orders')
     processed_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # Pending queue, newest first
+            models.Index(fields=['status', 'date_purchased'], name='order_status_date_idx'),
+            # A customer's order history, newest first
+            models.Index(fields=['customer', 'date_purchased'], name='order_customer_date_idx'),
+            # Management listing of all orders, newest first
+            models.Index(fields=['date_purchased'], name='order_date_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.transaction_id} by {self.customer.username} - {self.status}"
 
@@ -72,6 +106,34 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.customer.username}'s cart: {self.quantity}x {self.product.name}"
 
+class IdempotencyKey(models.Model):
+    # Remembers the response of a request made with an Idempotency-Key header
+    # so client retries replay it instead of repeating the side effects.
+    # Keys expire after settings.IDEMPOTENCY_KEY_TTL seconds and are then
+    # purged by `manage.py purge_idempotency_keys`.
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # Hash of the request the key was first used for, so reusing the key
+    # for a different request is refused rather than replayed
+    fingerprint = models.CharField(max_length=64, blank=True)
+    response = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    @classmethod
+    def expiry_cutoff(cls):
+        """Keys created before this moment have expired"""
+        return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+    @property
+    def is_expired(self):
+        return self.created_at < self.expiry_cutoff()
+
+    def __str__(self):
+        return f"{self.user.username} - {self.key}"
+
 class Review(models.Model):
     customer = models.ForeignKey(User, on_delete=models.CASCADE)
     review_text = models.TextField()
@@ -86,6 +148,12 @@ class Review(models.Model):
     class Meta:
         # We don't need unique_together anymore since we'll check date-based restrictions in the view
         ordering = ['-created_on']  # Newest reviews first
+        indexes = [
+            # Public and management listings, newest first
+            models.Index(fields=['created_on'], name='review_created_idx'),
+            # A customer's reviews and the one-review-per-day check
+            models.Index(fields=['customer', 'created_on'], name='review_customer_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer.username}'s shopping experience review on {self.created_on.strftime('%Y-%m-%d')}"
@@ -107,5 +175,49 @@ class SupportTicket(models.Model):
     resolution_note = models.TextField(blank=True)
     attachment = models.FileField(upload_to='support_attachments/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Support queue filtered by status, newest first
+            models.Index(fields=['status', 'submitted_on'], name='ticket_status_submitted_idx'),
+            # A customer's tickets, newest first
+            models.Index(fields=['customer', 'submitted_on'], name='ticket_customer_submitted_idx'),
+            # Management listing of all tickets, newest first
+            models.Index(fields=['submitted_on'], name='ticket_submitted_idx'),
+        ]
+
     def __str__(self):
         return f"Ticket #{self.id} by {self.customer.username} on {self.product.name}"
+
+class Job(models.Model):
+    # A unit of background work, run by `manage.py run_worker`. Workers claim
+    # a job by leasing it until locked_until; a job whose lease runs out
+    # (the worker died) becomes visible to other workers again.
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers polling for due pending jobs, oldest first
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            # Running jobs whose lease has expired
+            models.Index(fields=['status', 'locked_until'], name='job_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.id} {self.task} ({self.status})"
@@ -1,13 +1,88 @@
 from django.contrib.auth.models import User
 from .models import UserProfile, Product, Order, Review, SupportTicket
+from .inventory import recompute_reserved_quantities
+from .product_import import upsert_products
 from django.contrib.auth.hashers import make_password
 from datetime import datetime, timedelta
 import csv
 import os
 import random
 
+def product_rows_from_csv(reader):
+    """Product fields for each row of Products.csv"""
+    for row in reader:
+        # Clean and parse price
+        price_str = row.get('Price', '0').replace('CA$', '').replace('$', '').replace(',', '').strip()
+        try:
+            price = float(price_str)
+        except ValueError:
+            price = 0.0
+        
+        # Generate description based on CSV data
+        brand = row.get('Brand', '').strip()
+        # Handle BOM in the first column
+        category = row.get('Category', row.get('\ufeffCategory', '')).strip()
+        subcategory = row.get('Subcategory', '').strip()
+        subcategory2 = row.get('Subcategory2', '').strip()
+        product_name = row.get('Product name', '').strip()
+        
+        # Create a meaningful description
+        description_parts = []
+        if brand:
+            description_parts.append(f"High-quality {brand}")
+        if subcategory and subcategory != category:
+            description_parts.append(subcategory.lower())
+        if subcategory2 and subcategory2 != subcategory:
+            description_parts.append(subcategory2.lower())
+        if category:
+            description_parts.append(f"in the {category.lower()} category")
+        
+        if description_parts:
+            description = " ".join(description_parts) + "."
+        else:
+            description = f"Quality {product_name.lower()} product."
+        
+        # Make description more descriptive
+        if 'laptop' in product_name.lower():
+            description = f"Premium {brand} laptop featuring {subcategory2} specifications. Perfect for {subcategory.lower().replace('laptop', '').strip()} use with excellent performance and reliability."
+        elif 'desktop' in product_name.lower() or 'pc' in product_name.lower():
+            description = f"Powerful {brand} desktop computer with {subcategory2} performance. Ideal for {subcategory.lower().replace('pc', '').strip()} applications with robust processing capabilities."
+        elif 'phone' in product_name.lower() or 'smartphone' in product_name.lower():
+            description = f"Latest {brand} smartphone with cutting-edge technology. Features advanced capabilities and premium build quality for modern mobile communication."
+        elif 'tv' in product_name.lower():
+            description = f"Stunning {brand} television with {subcategory2} display technology. Delivers exceptional picture quality and immersive viewing experience."
+        elif 'printer' in product_name.lower():
+            description = f"Professional {brand} printer designed for {subcategory2.lower()} printing needs. Reliable, efficient, and produces high-quality prints."
+        elif 'vacuum' in product_name.lower():
+            description = f"Advanced {brand} vacuum cleaner with {subcategory2.lower()} technology. Powerful suction and convenient design for effective home cleaning."
+        elif 'microwave' in product_name.lower():
+            description = f"Efficient {brand} microwave oven with {subcategory2.lower()} capacity. Perfect for quick cooking and reheating with user-friendly controls."
+        elif 'fridge' in product_name.lower() or 'refridgerator' in product_name.lower():
+            description = f"Spacious {brand} refrigerator with {subcategory2.lower()} design. Energy-efficient cooling with ample storage space for all your food items."
+        elif 'washing machine' in product_name.lower():
+            description = f"Reliable {brand} washing machine with {subcategory2.lower()} capacity. Advanced cleaning technology with multiple wash cycles for different fabric types."
+        elif 'headphone' in product_name.lower() or 'earbuds' in product_name.lower():
+            description = f"Premium {brand} audio device with {subcategory2.lower()} design. Superior sound quality and comfort for extended listening sessions."
+        elif 'soundbar' in product_name.lower():
+            description = f"High-performance {brand} soundbar with {subcategory2.lower()} configuration. Enhanced audio experience with clear dialogue and immersive surround sound."
+        elif 'dashcam' in product_name.lower():
+            description = f"Advanced {brand} dashboard camera with {subcategory2.lower()} recording. Reliable road safety companion with high-definition video capture."
+        elif 'ink' in product_name.lower():
+            description = f"Compatible {brand} ink cartridge for {subcategory2.lower()} printing. High-quality ink formulation for sharp text and vibrant colors."
+        
+        yield {
+            'name': product_name,
+            'category': category,
+            'price': price,
+            'description': description,
+            # Only used for new products; existing stock is left alone
+            'stock_quantity': random.randint(10, 500),
+            'image_url': row.get('Image Url', '').strip(),
+            'is_active': True,
+        }
+
 def load_products_from_csv():
-    """Load products from CSV file and create Product objects"""
+    """Load products from CSV file and create or update Product objects in bulk"""
     # Path to the CSV file
     csv_path = os.path.join(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
@@ -20,95 +95,12 @@ def load_products_from_csv():
     
     print(f"Loading products from: {csv_path}")
     
-    products_created = 0
-    products_updated = 0
-    
     with open(csv_path, 'r', encoding='utf-8') as file:
         reader = csv.DictReader(file)
-        
-        for row in reader:
-            # Clean and parse price
-            price_str = row.get('Price', '0').replace('CA$', '').replace('$', '').replace(',', '').strip()
-            try:
-                price = float(price_str)
-            except ValueError:
-                price = 0.0
-            
-            # Generate description based on CSV data
-            brand = row.get('Brand', '').strip()
-            # Handle BOM in the first column
-            category = row.get('Category', row.get('\ufeffCategory', '')).strip()
-            subcategory = row.get('Subcategory', '').strip()
-            subcategory2 = row.get('Subcategory2', '').strip()
-            product_name = row.get('Product name', '').strip()
-            
-            # Create a meaningful description
-            description_parts = []
-            if brand:
-                description_parts.append(f"High-quality {brand}")
-            if subcategory and subcategory != category:
-                description_parts.append(subcategory.lower())
-            if subcategory2 and subcategory2 != subcategory:
-                description_parts.append(subcategory2.lower())
-            if category:
-                description_parts.append(f"in the {category.lower()} category")
-            
-            if description_parts:
-                description = " ".join(description_parts) + "."
-            else:
-                description = f"Quality {product_name.lower()} product."
-            
-            # Make description more descriptive
-            if 'laptop' in product_name.lower():
-                description = f"Premium {brand} laptop featuring {subcategory2} specifications. Perfect for {subcategory.lower().replace('laptop', '').strip()} use with excellent performance and reliability."
-            elif 'desktop' in product_name.lower() or 'pc' in product_name.lower():
-                description = f"Powerful {brand} desktop computer with {subcategory2} performance. Ideal for {subcategory.lower().replace('pc', '').strip()} applications with robust processing capabilities."
-            elif 'phone' in product_name.lower() or 'smartphone' in product_name.lower():
-                description = f"Latest {brand} smartphone with cutting-edge technology. Features advanced capabilities and premium build quality for modern mobile communication."
-            elif 'tv' in product_name.lower():
-                description = f"Stunning {brand} television with {subcategory2} display technology. Delivers exceptional picture quality and immersive viewing experience."
-            elif 'printer' in product_name.lower():
-                description = f"Professional {brand} printer designed for {subcategory2.lower()} printing needs. Reliable, efficient, and produces high-quality prints."
-            elif 'vacuum' in product_name.lower():
-                description = f"Advanced {brand} vacuum cleaner with {subcategory2.lower()} technology. Powerful suction and convenient design for effective home cleaning."
-            elif 'microwave' in product_name.lower():
-                description = f"Efficient {brand} microwave oven with {subcategory2.lower()} capacity. Perfect for quick cooking and reheating with user-friendly controls."
-            elif 'fridge' in product_name.lower() or 'refridgerator' in product_name.lower():
-                description = f"Spacious {brand} refrigerator with {subcategory2.lower()} design. Energy-efficient cooling with ample storage space for all your food items."
-            elif 'washing machine' in product_name.lower():
-                description = f"Reliable {brand} washing machine with {subcategory2.lower()} capacity. Advanced cleaning technology with multiple wash cycles for different fabric types."
-            elif 'headphone' in product_name.lower() or 'earbuds' in product_name.lower():
-                description = f"Premium {brand} audio device with {subcategory2.lower()} design. Superior sound quality and comfort for extended listening sessions."
-            elif 'soundbar' in product_name.lower():
-                description = f"High-performance {brand} soundbar with {subcategory2.lower()} configuration. Enhanced audio experience with clear dialogue and immersive surround sound."
-            elif 'dashcam' in product_name.lower():
-                description = f"Advanced {brand} dashboard camera with {subcategory2.lower()} recording. Reliable road safety companion with high-definition video capture."
-            elif 'ink' in product_name.lower():
-                description = f"Compatible {brand} ink cartridge for {subcategory2.lower()} printing. High-quality ink formulation for sharp text and vibrant colors."
-            
-            # Generate realistic stock quantity
-            stock_quantity = random.randint(10, 500)
-            
-            # Create or update product
-            product, created = Product.objects.update_or_create(
-                name=product_name,
-                defaults={
-                    'category': category,
-                    'price': price,
-                    'description': description,
-                    'stock_quantity': stock_quantity,
-                    'image_url': row.get('Image Url', '').strip(),
-                    'is_active': True,
-                }
-            )
-            
-            if created:
-                products_created += 1
-            else:
-                products_updated += 1
+        stats = upsert_products(product_rows_from_csv(reader))
     
-    print(f"Successfully loaded {products_created} new products and updated {products_updated} existing products")
-    return products_created, products_updated
+    print(f"Successfully loaded {stats.created} new products and updated {stats.updated} existing products ({stats})")
+    return stats.created, stats.updated
 
 def initiate():
     # Load products from CSV first
@@ -346,6 +338,10 @@ def initiate():
                         transaction_id=f"TXN{demo_customer.id}{product_idx:03d}{products[product_idx].id:03d}",
                         total_amount=products[product_idx].price
                     )
+
+    # Demo orders are created pending, so bring the reservation counters in line
+    recompute_reserved_quantities()
+
 def populate_products():
     """
     Main function to populate products and other demo data in the database.
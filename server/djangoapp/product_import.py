@@ -0,0 +1,124 @@
+"""
+Bulk product import by name, in chunks.
+
+Each chunk of rows is resolved against the database with one
+name__in query, then written with bulk_create for new names and
+bulk_update for products whose fields changed, inside one transaction per
+chunk. Unchanged products aren't written at all, so re-importing the same
+file costs one SELECT per chunk.
+
+Used by `manage.py load_products` and populate.load_products_from_csv.
+"""
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from . import catalog_cache
+from .models import Product
+
+# Rows resolved and written per chunk, each chunk in its own transaction
+IMPORT_BATCH_SIZE = 500
+
+# Fields an import overwrites on existing products. stock_quantity is only
+# set for new products, so a re-import never resets stock held by orders.
+UPDATE_FIELDS = ['category', 'price', 'description', 'image_url', 'is_active']
+
+
+class ImportStats:
+    """Running totals of an import"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.started = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.rows} rows: {self.created} created, {self.updated} updated, "
+                f"{self.unchanged} unchanged in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _normalize(fields):
+    fields = dict(fields)
+    if 'price' in fields:
+        # Compare like the DecimalField stores it, so an unchanged price is equal
+        fields['price'] = Decimal(str(fields['price'])).quantize(Decimal('0.01'))
+    return fields
+
+
+def _upsert_chunk(rows, stats):
+    # Later rows for the same name win, as with update_or_create row by row
+    by_name = {}
+    for fields in rows:
+        by_name[fields['name']] = _normalize(fields)
+
+    # Plain tuples; model instances are only built for rows being written
+    existing = defaultdict(list)
+    for pk, name, *values in Product.objects.filter(name__in=by_name).values_list('pk', 'name', *UPDATE_FIELDS):
+        existing[name].append((pk, dict(zip(UPDATE_FIELDS, values))))
+
+    to_create, to_update = [], []
+    for name, fields in by_name.items():
+        matches = existing.get(name)
+        if not matches:
+            to_create.append(Product(**fields))
+            continue
+        # Every product sharing the name is updated, as names aren't unique
+        for pk, current in matches:
+            wanted = {field: fields.get(field, current[field]) for field in UPDATE_FIELDS}
+            if wanted == current:
+                stats.unchanged += 1
+            else:
+                to_update.append(Product(pk=pk, **wanted))
+
+    if to_create or to_update:
+        with transaction.atomic():
+            Product.objects.bulk_create(to_create)
+            Product.objects.bulk_update(to_update, UPDATE_FIELDS)
+
+    stats.rows += len(rows)
+    stats.created += len(to_create)
+    stats.updated += len(to_update)
+    return to_update
+
+
+def upsert_products(rows, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Create or update products from rows, an iterable of dicts of Product
+    fields that each include 'name'. Rows are consumed batch_size at a time.
+    progress, if given, is called with the ImportStats after every chunk.
+    Returns the ImportStats.
+    """
+    stats = ImportStats()
+    changed_ids = []
+    for chunk in _chunks(rows, batch_size):
+        changed_ids.extend(product.pk for product in _upsert_chunk(chunk, stats))
+        if progress:
+            progress(stats)
+
+    # Bulk writes skip the post_save signal that keeps the catalog cache fresh
+    if stats.created or changed_ids:
+        catalog_cache.invalidate_products(changed_ids)
+    return stats
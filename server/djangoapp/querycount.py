@@ -0,0 +1,90 @@
+"""
+SQL query counting and N+1 detection.
+
+QueryRecorder hooks into every database connection with an execute wrapper,
+counts queries and groups them by fingerprint (the SQL with literals and
+parameter lists normalized away). The same fingerprint running many times in
+one request is the signature of an N+1 loop.
+
+Used by djangoapp.middleware.QueryCountMiddleware per request, and by
+assert_max_queries in tests.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# A query shape seen this many times in one request is reported as N+1
+DEFAULT_REPEAT_THRESHOLD = 5
+
+
+def fingerprint(sql):
+    """Normalize SQL so queries differing only in literal values compare equal"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PARAM_LIST.sub("(?)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+    """Execute wrapper that records the count, duration and shapes of queries"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.queries = []
+        # (sql, params, many) of every query, e.g. to EXPLAIN them afterwards
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+            self.queries.append(sql)
+            self.statements.append((sql, params, many))
+
+    @contextmanager
+    def capture(self):
+        """Record queries on every configured database while the block runs"""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def repeated(self, threshold=DEFAULT_REPEAT_THRESHOLD):
+        """Return {fingerprint: count} for query shapes repeated at least `threshold` times"""
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+
+@contextmanager
+def assert_max_queries(budget, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+    """
+    Fail if the block runs more than `budget` queries or repeats a query shape
+    `repeat_threshold` or more times.
+
+        with assert_max_queries(4):
+            client.get('/djangoapp/api/cart')
+    """
+    recorder = QueryRecorder()
+    with recorder.capture():
+        yield recorder
+
+    problems = []
+    if recorder.count > budget:
+        problems.append(f"{recorder.count} queries executed, budget is {budget}")
+    for shape, count in recorder.repeated(repeat_threshold).items():
+        problems.append(f"N+1: {count}x {shape}")
+    if problems:
+        raise AssertionError("\n".join(problems + ["Queries:"] + recorder.queries))
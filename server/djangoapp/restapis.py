@@ -1,60 +1,411 @@
-# Uncomment the imports below before you add the function code
-import requests
+import logging
 import os
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import requests
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    # Only needed by the async views
+    httpx = None
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 backend_url = os.getenv(
     'backend_url', default="http://localhost:3030")
 sentiment_analyzer_url = os.getenv(
     'sentiment_analyzer_url',
     default="http://localhost:5002/")
 
-def get_request(endpoint, **kwargs):
-    """Add code for get requests to back end"""
-    params = ""
-    if kwargs:
-        for key, value in kwargs.items():
-            params += f"{key}={value}&"
-    
-    request_url = backend_url + endpoint + "?" + params
-    
-    print(f"GET from {request_url}")
+# Seconds to wait for a connection and for a response
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+# Extra attempts after a connection error or 502/503/504. Only GETs are
+# retried once the request was sent, so a review is never posted twice.
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', 0.2))
+# Keep-alive connections kept per upstream host
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+# Texts per /analyze/batch request, and the read timeout of such a request
+SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', 250))
+HTTP_BATCH_READ_TIMEOUT = float(os.getenv('HTTP_BATCH_READ_TIMEOUT', 60))
+# Concurrent requests one async worker may have in flight to all upstreams
+HTTP_ASYNC_MAX_CONNECTIONS = int(os.getenv('HTTP_ASYNC_MAX_CONNECTIONS', 100))
+# Consecutive failures that open an upstream's circuit, and seconds it stays
+# open before a single probe request is let through
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30))
+# Seconds a last-good get_request response may be served while the backend fails
+FALLBACK_CACHE_TTL = float(os.getenv('FALLBACK_CACHE_TTL', 300))
+FALLBACK_CACHE_SIZE = int(os.getenv('FALLBACK_CACHE_SIZE', 256))
+
+
+def build_session():
+    """A requests.Session with pooled keep-alive connections and retries"""
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        backoff_jitter=HTTP_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+session = build_session()
+
+
+class UpstreamStats:
+    """Thread-safe call, error and latency counters per upstream"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, upstream, elapsed, error):
+        with self._lock:
+            entry = self._stats.setdefault(upstream, {
+                'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            })
+            entry['calls'] += 1
+            entry['errors'] += int(error)
+            entry['total_ms'] += elapsed * 1000
+            entry['max_ms'] = max(entry['max_ms'], elapsed * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                upstream: {
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'avg_ms': round(entry['total_ms'] / entry['calls'], 1),
+                    'max_ms': round(entry['max_ms'], 1),
+                }
+                for upstream, entry in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+upstream_stats = UpstreamStats()
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is down.
+
+    closed:    calls go through; `failure_threshold` consecutive failures
+               open the circuit
+    open:      calls are refused without touching the network until
+               `reset_timeout` seconds have passed
+    half_open: one probe call goes through; success closes the circuit,
+               failure opens it again
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._rejected = 0
+
+    def allow(self):
+        """Whether a call may be made now"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {'state': self._state, 'failures': self._failures, 'rejected': self._rejected}
+            if self._state == self.OPEN:
+                snapshot['retry_in'] = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return snapshot
+
+
+breakers = {
+    'backend': CircuitBreaker(),
+    'sentiment': CircuitBreaker(),
+}
+
+
+class FallbackCache:
+    """Bounded, thread-safe cache of last-good responses with a TTL"""
+
+    def __init__(self, ttl=FALLBACK_CACHE_TTL, max_entries=FALLBACK_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """The cached value, or None if missing or older than the TTL"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fallback_cache = FallbackCache()
+
+
+def stats():
+    """Per-upstream counters and circuit state, for the health endpoint"""
+    counters = upstream_stats.snapshot()
+    return {
+        upstream: {**counters.get(upstream, {'calls': 0, 'errors': 0}), 'circuit': breaker.snapshot()}
+        for upstream, breaker in breakers.items()
+    }
+
+
+def _call(upstream, method, url, **kwargs):
+    """
+    Send a request and return the decoded JSON body, or None on a network
+    error, a 5xx response, a body that isn't JSON or an open circuit.
+    """
+    breaker = breakers[upstream]
+    if not breaker.allow():
+        logger.debug(f"{upstream} circuit open, skipping {method} {url}")
+        return None
+
+    kwargs.setdefault('timeout', (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    logger.debug(f"{method} {url}")
+    started = time.perf_counter()
+    error = True
     try:
-        # Call get method of requests library with URL and parameters
-        response = requests.get(request_url)
-        return response.json()
-    except Exception as e:
-        # If any error occurs
-        print(f"Network exception occurred: {e}")
+        response = session.request(method, url, **kwargs)
+        if response.status_code >= 500:
+            logger.warning(f"{upstream} returned {response.status_code} for {method} {url}")
+            return None
+        result = response.json()
+        error = False
+        return result
+    except requests.RequestException as e:
+        # requests' JSONDecodeError is a RequestException too
+        logger.warning(f"{upstream} request failed: {method} {url}: {e}")
         return None
+    finally:
+        upstream_stats.record(upstream, time.perf_counter() - started, error)
+        if error:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
 
-def analyze_review_sentiments(text):
-    """Add code for retrieving sentiments"""
-    import urllib.parse
-    encoded_text = urllib.parse.quote(text, safe='')
-    # Use the environment variable or fallback to localhost
+
+def _fallback_key(endpoint, params):
+    return endpoint, tuple(sorted((key, str(value)) for key, value in params.items()))
+
+
+def _with_fallback(endpoint, params, result):
+    # Remember good responses, fall back to the last one on failure
+    key = _fallback_key(endpoint, params)
+    if result is not None:
+        fallback_cache.set(key, result)
+        return result
+    stale = fallback_cache.get(key)
+    if stale is not None:
+        logger.info(f"Serving last good response for {endpoint}")
+    return stale
+
+
+def _sentiment_base_url():
     base_url = sentiment_analyzer_url if sentiment_analyzer_url else "http://localhost:5002/"
     if not base_url.endswith('/'):
         base_url += '/'
-    request_url = base_url + "analyze/" + encoded_text
+    return base_url
+
+
+def _sentiment_url(text):
+    return _sentiment_base_url() + "analyze/" + urllib.parse.quote(text, safe='')
+
+
+def get_request(endpoint, **kwargs):
+    """
+    GET a backend endpoint, passing kwargs as query parameters.
+    While the backend is failing, the last good response for the same
+    endpoint and parameters is returned if it is recent enough.
+    """
+    result = _call('backend', 'GET', backend_url + endpoint, params=kwargs)
+    return _with_fallback(endpoint, kwargs, result)
+
+
+def analyze_review_sentiments(text):
+    """Return the sentiment analyzer's result for text"""
+    return _call('sentiment', 'GET', _sentiment_url(text))
+
+
+def analyze_review_sentiments_batch(texts):
+    """
+    Analyze many texts with one request per SENTIMENT_BATCH_SIZE texts.
+    Returns one result per text, in order. Texts whose batch failed get None.
+    """
+    results = []
+    for start in range(0, len(texts), SENTIMENT_BATCH_SIZE):
+        chunk = list(texts[start:start + SENTIMENT_BATCH_SIZE])
+        response = _call(
+            'sentiment', 'POST', _sentiment_base_url() + "analyze/batch", json=chunk,
+            timeout=(HTTP_CONNECT_TIMEOUT, HTTP_BATCH_READ_TIMEOUT),
+        )
+        chunk_results = response.get('results') if isinstance(response, dict) else None
+        if not isinstance(chunk_results, list) or len(chunk_results) != len(chunk):
+            chunk_results = [None] * len(chunk)
+        results.extend(chunk_results)
+    return results
+
+
+def post_review(data_dict):
+    """POST a review to the backend"""
+    return _call('backend', 'POST', backend_url + "/insert_review", json=data_dict)
+
+
+# Async variants for the async views. They share the circuit breakers,
+# counters and fallback cache with the functions above. Under ASGI
+# (djangoproj.asgi) each worker opens one pooled httpx.AsyncClient at
+# lifespan startup and closes it at shutdown. Without a lifespan, e.g. under
+# runserver or in tests, every call gets a client of its own that is closed
+# once the call returns. httpx retries failed connections only.
+
+_async_client = None
+
+
+def build_async_client():
+    """An httpx.AsyncClient with pooled keep-alive connections and retries"""
+    if httpx is None:
+        raise ImproperlyConfigured("The async upstream calls require httpx (pip install httpx)")
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=HTTP_ASYNC_MAX_CONNECTIONS, max_keepalive_connections=HTTP_POOL_SIZE),
+        transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES),
+    )
+
+
+async def open_async_client():
+    """Open the worker's shared async client; called at ASGI lifespan startup"""
+    global _async_client
+    if _async_client is None:
+        _async_client = build_async_client()
+
+
+async def close_async_client():
+    """Close the worker's shared async client; called at ASGI lifespan shutdown"""
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def _async_client_for_call():
+    if _async_client is not None:
+        yield _async_client
+    else:
+        async with build_async_client() as client:
+            yield client
+
+
+async def _acall(upstream, method, url, **kwargs):
+    """Async counterpart of _call"""
+    breaker = breakers[upstream]
+    if not breaker.allow():
+        logger.debug(f"{upstream} circuit open, skipping {method} {url}")
+        return None
+
+    kwargs.setdefault('timeout', httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT))
+    logger.debug(f"{method} {url}")
+    started = time.perf_counter()
+    error = True
     try:
-        # Call get method of requests library with URL and parameters
-        response = requests.get(request_url)
+        async with _async_client_for_call() as client:
+            response = await client.request(method, url, **kwargs)
+        if response.status_code >= 500:
+            logger.warning(f"{upstream} returned {response.status_code} for {method} {url}")
+            return None
         result = response.json()
+        error = False
         return result
-    except Exception as e:
-        print(f"Sentiment analysis error: {e}")
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"{upstream} request failed: {method} {url}: {e}")
         return None
+    finally:
+        upstream_stats.record(upstream, time.perf_counter() - started, error)
+        if error:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
 
-def post_review(data_dict):
-    """Add code for posting review"""
-    request_url = backend_url + "/insert_review"
-    try:
-        response = requests.post(request_url, json=data_dict)
-        print(response.json())
-        return response.json()
-    except Exception as e:
-        print(f"Network exception occurred {e}")
-        return None
+
+async def async_get_request(endpoint, **kwargs):
+    """Async counterpart of get_request"""
+    result = await _acall('backend', 'GET', backend_url + endpoint, params=kwargs)
+    return _with_fallback(endpoint, kwargs, result)
+
+
+async def async_analyze_review_sentiments(text):
+    """Async counterpart of analyze_review_sentiments"""
+    return await _acall('sentiment', 'GET', _sentiment_url(text))
+
+
+async def async_post_review(data_dict):
+    """Async counterpart of post_review"""
+    return await _acall('backend', 'POST', backend_url + "/insert_review", json=data_dict)
@@ -0,0 +1,64 @@
+"""
+Role resolution for privileged views.
+
+The role is read from the user's UserProfile on every request, never from a
+copy kept in the session or a per-process cache, so a changed or removed
+role takes effect on the user's next request whichever process serves it.
+This costs no extra query: djangoapp.backends.ProfileBackend loads the
+profile in the same query as the session's user. Within a request the role
+is resolved once and kept on the request.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+
+from .models import UserProfile
+
+
+def remember_role(request, role):
+    """Keep an already known role on the request"""
+    request._cached_user_role = role
+
+
+def get_user_role(request):
+    """
+    Return the lowercase role of the request's user ('customer', 'manager',
+    'admin' or 'support'), or None for anonymous users and users without a
+    profile.
+    """
+    if hasattr(request, '_cached_user_role'):
+        return request._cached_user_role
+    if not request.user.is_authenticated:
+        return None
+
+    try:
+        # Already loaded with the user by ProfileBackend; one query otherwise
+        role = request.user.userprofile.role
+    except UserProfile.DoesNotExist:
+        role = None
+    remember_role(request, role.lower() if role else None)
+    return request._cached_user_role
+
+
+def require_role(*roles, allow_staff=False):
+    """
+    Restrict a view to users whose role is one of `roles`.
+    Responds with HTTP 401 for anonymous users and 403 for other roles,
+    repeating the code in the JSON body's "status" like the other views.
+    With allow_staff, Django staff and superusers are let through as well.
+
+        @require_role('manager', 'admin')
+        def get_pending_orders(request): ...
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({"status": 401, "message": "Authentication required"}, status=401)
+            if allow_staff and (request.user.is_staff or request.user.is_superuser):
+                return view(request, *args, **kwargs)
+            if get_user_role(request) not in roles:
+                return JsonResponse({"status": 403, "message": "Access denied"}, status=403)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,63 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the "default" (primary) database. Reads go to the
+"replica" alias only inside views decorated with @read_replica, and only
+when settings.DATABASES defines a replica. Everything else, including
+reads that must see a write made in the same request, stays on the primary.
+
+Views that fill the shared catalog cache are not decorated: an entry built
+from a lagging replica right after an invalidation would keep serving the
+old rows for the whole cache timeout, not just for the replication lag.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_alias():
+    """Alias reads should use right now"""
+    if _use_replica.get() and REPLICA in settings.DATABASES:
+        return REPLICA
+    return 'default'
+
+
+def read_replica(view):
+    """Serve the view's queries from the read replica, if one is configured"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Route reads of djangoapp models to the replica inside @read_replica views.
+    Sessions and auth stay on the primary so a fresh login is never lost to
+    replication lag.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'djangoapp':
+            return replica_alias()
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication
+        return db == 'default'
@@ -0,0 +1,35 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import catalog_cache
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, instance, using, **kwargs):
+    """
+    Drop cached catalog entries whenever a product is saved or deleted.
+    Deferred until the write commits: retired any earlier, a concurrent read
+    could refill the cache from the old rows under the new generation.
+    """
+    transaction.on_commit(partial(catalog_cache.invalidate_product, instance.pk), using=using)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Tune every new SQLite connection with settings.SQLITE_PRAGMAS.
+    Run on the raw sqlite3 connection, so they bypass Django's execute
+    wrappers and aren't counted against the query budget of the request
+    that happened to open the connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f"PRAGMA {pragma}={value}")
@@ -0,0 +1,115 @@
+"""
+Streamed JSON listings.
+
+Management listings cover whole tables, so rather than building every row
+and then one big JSON string in memory, they are sent as a
+StreamingHttpResponse while rows are read from a .iterator() queryset. Peak
+memory is one chunk of rows however large the table is, and the first bytes
+go out before the last row has been read.
+
+The default body is the same {"status": 200, "<key>": [...]} document the
+listings returned as a JsonResponse. With ?format=ndjson, or an Accept
+header asking for NDJSON, each row is sent as its own JSON line instead.
+
+Under ASGI, Django reads a synchronous iterator into a list before sending
+any of it, so streaming_response() hands ASGI requests an async iterator
+that pulls one piece at a time instead.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson')
+
+# Rows fetched from the database per round trip
+STREAM_CHUNK_SIZE = 2000
+
+# Characters collected before a piece of the body is handed to the server,
+# so large listings aren't written one small row at a time
+STREAM_BUFFER_SIZE = 64 * 1024
+
+_encoder = DjangoJSONEncoder()
+
+_DONE = object()
+
+
+def iterate(queryset, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    serialize() of each row of queryset, read with .iterator(). The database
+    is picked now, while the view runs, rather than when the response is
+    consumed after the view has returned, so @read_replica still applies.
+    """
+    queryset = queryset.using(queryset.db)
+    return (serialize(obj) for obj in queryset.iterator(chunk_size=chunk_size))
+
+
+def wants_ndjson(request):
+    if request.GET.get('format') == 'ndjson':
+        return True
+    accept = request.headers.get('Accept', '')
+    return any(content_type in accept for content_type in NDJSON_TYPES)
+
+
+def buffered(pieces, buffer_size=STREAM_BUFFER_SIZE):
+    """
+    Join a stream of strings into parts of about buffer_size characters.
+    The first piece goes out right away, so a client sees the response start
+    before the rest has been read.
+    """
+    pieces = iter(pieces)
+    yield next(pieces, '')
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _json_document(key, rows):
+    yield '{"status": 200, %s: [' % json.dumps(key)
+    for index, row in enumerate(rows):
+        yield (', ' if index else '') + _encoder.encode(row)
+    yield ']}'
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield _encoder.encode(row) + '\n'
+
+
+async def _pull(pieces):
+    # Each piece is produced on the request's sync thread, where the view ran
+    # and where the queryset's cursor is read, like under WSGI
+    pieces = iter(pieces)
+    pull = sync_to_async(next)
+    try:
+        while (piece := await pull(pieces, _DONE)) is not _DONE:
+            yield piece
+    finally:
+        close = getattr(pieces, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_response(request, pieces, **kwargs):
+    """A StreamingHttpResponse that sends pieces as they are produced, under WSGI or ASGI"""
+    if isinstance(request, ASGIRequest):
+        pieces = _pull(pieces)
+    return StreamingHttpResponse(pieces, **kwargs)
+
+
+def list_response(request, key, rows):
+    """
+    Stream rows as {"status": 200, key: [...]}, or as NDJSON if the request
+    asks for it. rows may be a lazy iterable such as the result of iterate().
+    """
+    if wants_ndjson(request):
+        return streaming_response(request, buffered(_ndjson(rows)), content_type='application/x-ndjson')
+    return streaming_response(request, buffered(_json_document(key, rows)), content_type='application/json')
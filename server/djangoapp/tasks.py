@@ -0,0 +1,24 @@
+"""
+Background tasks run by `manage.py run_worker`. Queue them with
+jobs.enqueue('<function name>', {...keyword arguments...}).
+"""
+from . import restapis
+from .jobs import task
+from .models import Review
+
+
+class SentimentUnavailable(Exception):
+    """The sentiment analyzer gave no label; the job is retried later"""
+
+
+@task
+def score_review_sentiment(review_id):
+    """Fill in Review.sentiment from the sentiment analyzer"""
+    review = Review.objects.filter(pk=review_id).only('review_text').first()
+    if review is None:
+        # Deleted since it was queued
+        return
+    result = restapis.analyze_review_sentiments(review.review_text)
+    if not isinstance(result, dict) or not result.get('label'):
+        raise SentimentUnavailable(f"No sentiment for review {review_id}: {result!r}")
+    Review.objects.filter(pk=review_id).update(sentiment=result['label'])
@@ -0,0 +1,117 @@
+"""
+Concurrent order approvals against a SQLite file database, run by
+test_concurrent_approval in a process of its own so that it can point Django
+at the file and pick the journal mode.
+
+Seeds one product and many pending orders for it, lets a pool of threads
+approve every order twice (duplicate approvals race each other) and prints
+the outcome counts and the final product row as JSON.
+
+Usage:
+    DATABASE_URL=sqlite:////tmp/stress.sqlite3 SQLITE_JOURNAL_MODE=wal \
+        python -m djangoapp.tests.approval_stress [--threads 8] [--orders 200] [--stock 80]
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Approve orders concurrently against SQLite")
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent approver threads')
+    parser.add_argument('--orders', type=int, default=200, help='Pending orders to approve')
+    parser.add_argument('--stock', type=int, default=80, help='Initial product stock')
+    return parser.parse_args()
+
+
+def run(args):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
+    import django
+    django.setup()
+
+    from datetime import date
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection, OperationalError
+    from djangoapp import inventory
+    from djangoapp.models import Product, Order
+
+    call_command('migrate', verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        journal_mode = cursor.fetchone()[0]
+
+    manager = User.objects.create_user('stress_manager', password='unused')
+    product = Product.objects.create(
+        name='Stress Product', category='Stress', price=1, description='',
+        stock_quantity=args.stock, reserved_quantity=args.orders,
+    )
+    Order.objects.bulk_create([
+        Order(customer=manager, product=product, quantity=1,
+              date_purchased=date.today(), transaction_id=f'STRESS{i}', status='pending')
+        for i in range(args.orders)
+    ])
+    order_ids = list(Order.objects.values_list('id', flat=True))
+    connection.close()
+
+    work = queue.Queue()
+    for order_id in order_ids + order_ids:
+        work.put(order_id)
+
+    counts = {'approved': 0, 'insufficient': 0, 'already_processed': 0, 'locked_retries': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def worker():
+        try:
+            while True:
+                try:
+                    order_id = work.get_nowait()
+                except queue.Empty:
+                    return
+                for attempt in range(5):
+                    try:
+                        inventory.approve_order(Order.objects.get(pk=order_id), manager)
+                        bump('approved')
+                    except inventory.OrderAlreadyProcessed:
+                        bump('already_processed')
+                    except inventory.InsufficientStock:
+                        bump('insufficient')
+                    except OperationalError:
+                        bump('locked_retries')
+                        time.sleep(0.01 * (attempt + 1))
+                        continue
+                    except Exception:
+                        bump('errors')
+                    break
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    product.refresh_from_db()
+    return {
+        'journal_mode': journal_mode,
+        'seconds': elapsed,
+        'counts': counts,
+        'stock': product.stock_quantity,
+        'reserved': product.reserved_quantity,
+        'approved': Order.objects.filter(status='approved').count(),
+        'pending': Order.objects.filter(status='pending').count(),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(parse_args())))
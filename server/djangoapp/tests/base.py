@@ -0,0 +1,73 @@
+"""
+Shared fixtures for the endpoint tests: a small shop with a customer, a
+manager, products in two categories and some orders, reviews, tickets and
+cart lines, plus a helper that runs a request while recording its SQL.
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from djangoapp.models import CartItem, Order, Product, Review, SupportTicket, UserProfile
+from djangoapp.querycount import QueryRecorder
+
+PASSWORD = 'test-password'
+
+
+class ShopTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = cls.create_user('customer1', 'customer')
+        cls.manager = cls.create_user('manager1', 'manager')
+
+        cls.products = [
+            Product.objects.create(
+                name=f"Product {index:02d}", category='Laptops' if index % 2 else 'Phones',
+                price=100 + index, description='A product', stock_quantity=50,
+            )
+            for index in range(10)
+        ]
+        cls.orders = [
+            Order.objects.create(
+                customer=cls.customer, product=product, quantity=1, date_purchased=date(2026, 1, index + 1),
+                transaction_id=f"TXNTEST{index:02d}", total_amount=product.price,
+            )
+            for index, product in enumerate(cls.products[:4])
+        ]
+        for index in range(3):
+            Review.objects.create(customer=cls.customer, review_text=f"Review {index}", rating=4)
+        for order in cls.orders[:2]:
+            SupportTicket.objects.create(
+                customer=cls.customer, product=order.product, order=order, issue_description='Broken',
+            )
+
+    @classmethod
+    def create_user(cls, username, role):
+        user = User.objects.create_user(username=username, password=PASSWORD)
+        UserProfile.objects.create(user=user, role=role)
+        return user
+
+    def setUp(self):
+        # Catalog pages are cached across requests; every test starts cold
+        cache.clear()
+
+    def client_for(self, user=None):
+        client = Client()
+        if user is not None:
+            client.login(username=user.username, password=PASSWORD)
+        return client
+
+    def fill_cart(self, user, lines=2):
+        for product in self.products[-lines:]:
+            CartItem.objects.create(customer=user, product=product, quantity=1)
+
+    def record(self, client, method, path, **kwargs):
+        """Make a request, including reading a streamed body, and return (response, recorder)"""
+        recorder = QueryRecorder()
+        with recorder.capture():
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                response.content_bytes = b''.join(response.streaming_content)
+        return response, recorder
@@ -0,0 +1,43 @@
+import warnings
+
+from django.test import AsyncClient
+
+from djangoapp import restapis
+from djangoproj import asgi
+
+from .base import ShopTestCase
+
+
+class ASGITests(ShopTestCase):
+
+    async def test_lifespan_opens_and_closes_the_shared_client(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+        clients = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+            clients.append(restapis._async_client)
+
+        await asgi.application({'type': 'lifespan'}, receive, send)
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        opened, closed = clients
+        self.assertIsNotNone(opened)
+        self.assertIsNone(closed)
+        self.assertTrue(opened.is_closed)
+
+    async def test_streamed_export_is_not_buffered(self):
+        client = AsyncClient()
+        await client.aforce_login(self.manager)
+        with warnings.catch_warnings():
+            # Django warns when it has to read a sync iterator into a list
+            warnings.simplefilter('error')
+            response = await client.get('/djangoapp/api/manager/export/orders')
+            self.assertTrue(response.is_async)
+            content = b''.join([part async for part in response.streaming_content]).decode()
+        lines = content.splitlines()
+        self.assertTrue(lines[0].startswith('id,transaction_id,'))
+        self.assertEqual(len(lines), 1 + len(self.orders))
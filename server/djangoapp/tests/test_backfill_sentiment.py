@@ -0,0 +1,24 @@
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+
+from djangoapp.management.commands import backfill_sentiment
+from djangoapp.microservices import sentiment_analyzer as sa
+
+TEXTS = ['I love this laptop', 'Terrible, it broke in a day', 'It is a phone', 'Not bad', 'ok']
+
+
+@skipUnless(sa.VADER_AVAILABLE, "vaderSentiment is not installed")
+class BackfillSentimentTests(SimpleTestCase):
+
+    def test_local_labels_match_the_service(self):
+        backfill_sentiment._init_vader()
+        self.assertEqual(
+            backfill_sentiment.score_locally(TEXTS),
+            [sa.sentiment_analyzer_vader(text)['label'] for text in TEXTS],
+        )
+
+    def test_thresholds_are_inclusive(self):
+        self.assertEqual(sa.vader_label(sa.VADER_POSITIVE_THRESHOLD), 'positive')
+        self.assertEqual(sa.vader_label(sa.VADER_NEGATIVE_THRESHOLD), 'negative')
+        self.assertEqual(sa.vader_label(0.0), 'neutral')
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+
+from djangoapp import catalog_cache, inventory
+
+from .base import ShopTestCase
+
+
+class CatalogCacheTests(ShopTestCase):
+
+    def test_product_save_retires_the_cache_on_commit(self):
+        generation = catalog_cache._generation()
+        product = self.products[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = 999
+            product.save()
+            # Still inside the writer's transaction: other requests see the old row
+            self.assertEqual(cache.get(catalog_cache.GENERATION_KEY), generation)
+        self.assertNotEqual(cache.get(catalog_cache.GENERATION_KEY), generation)
+
+    def test_rolled_back_approval_keeps_the_cache(self):
+        generation = catalog_cache._generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            inventory.approve_order(self.orders[0], self.manager)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(cache.get(catalog_cache.GENERATION_KEY), generation)
+
+        order = self.orders[1]
+        order.product.stock_quantity = 0
+        order.product.save()
+        generation = catalog_cache._generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(inventory.InsufficientStock):
+                inventory.approve_order(order, self.manager)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(cache.get(catalog_cache.GENERATION_KEY), generation)
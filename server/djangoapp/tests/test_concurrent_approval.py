@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+SERVER_DIR = str(settings.BASE_DIR)
+THREADS, ORDERS, STOCK = 8, 200, 80
+
+
+class ConcurrentApprovalTests(SimpleTestCase):
+    """
+    Many threads approve the same orders against a SQLite file database, each
+    order twice. Approval must never oversell, approve an order twice or lose
+    an update, whatever the journal mode.
+    """
+
+    def stress(self, journal_mode):
+        with tempfile.TemporaryDirectory(prefix='stress-approval-') as db_dir:
+            env = {
+                key: value for key, value in os.environ.items()
+                if key not in ('DATABASE_REPLICA_URL', 'DJANGO_SETTINGS_MODULE')
+            }
+            env.update(
+                DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'stress.sqlite3')}",
+                SQLITE_JOURNAL_MODE=journal_mode,
+            )
+            completed = subprocess.run(
+                [sys.executable, '-m', 'djangoapp.tests.approval_stress',
+                 '--threads', str(THREADS), '--orders', str(ORDERS), '--stock', str(STOCK)],
+                cwd=SERVER_DIR, env=env, capture_output=True, text=True, timeout=300,
+            )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def check_invariants(self, result):
+        counts = result['counts']
+        self.assertEqual(counts['errors'], 0, counts)
+        # No order approved twice, and every approval is reflected in the stock
+        self.assertEqual(result['approved'], counts['approved'])
+        self.assertEqual(result['approved'], min(ORDERS, STOCK))
+        self.assertEqual(result['stock'], STOCK - result['approved'])
+        self.assertGreaterEqual(result['stock'], 0)
+        self.assertEqual(result['reserved'], result['pending'])
+        self.assertEqual(counts['approved'] + counts['insufficient'] + counts['already_processed'], 2 * ORDERS)
+
+    def test_wal(self):
+        result = self.stress('wal')
+        self.assertEqual(result['journal_mode'], 'wal')
+        self.check_invariants(result)
+
+    def test_rollback_journal(self):
+        result = self.stress('delete')
+        self.assertEqual(result['journal_mode'], 'delete')
+        self.check_invariants(result)
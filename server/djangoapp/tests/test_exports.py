@@ -0,0 +1,28 @@
+import csv
+import io
+
+from djangoapp import exports
+from djangoapp.models import Review
+
+from .base import ShopTestCase
+
+
+class ExportTests(ShopTestCase):
+
+    def export_csv(self, table):
+        content = b''.join(exports.stream(exports.queryset(table), table, 'csv')).decode()
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        for text in ('=HYPERLINK("http://evil")', '+1', '-2', '@SUM(A1)', '\tx', '\rx'):
+            Review.objects.create(customer=self.customer, review_text=text, rating=1)
+        texts = [row['review_text'] for row in self.export_csv('reviews')]
+        for text in texts:
+            self.assertFalse(text.startswith(exports.FORMULA_PREFIXES), text)
+        self.assertIn("'" + '=HYPERLINK("http://evil")', texts)
+        self.assertIn('Review 0', texts)
+
+    def test_ndjson_is_not_escaped(self):
+        Review.objects.create(customer=self.customer, review_text='=1+1', rating=1)
+        content = b''.join(exports.stream(exports.queryset('reviews'), 'reviews', 'ndjson')).decode()
+        self.assertIn('"review_text": "=1+1"', content)
@@ -0,0 +1,45 @@
+import json
+
+from djangoapp import inventory
+from djangoapp.models import CartItem, Order, Product
+
+from .base import ShopTestCase
+
+
+class InventoryTests(ShopTestCase):
+
+    def test_checkout_short_of_stock_reserves_nothing(self):
+        self.fill_cart(self.customer, lines=3)
+        short = self.products[-1]
+        Product.objects.filter(pk=short.pk).update(stock_quantity=0)
+
+        body = self.client_for(self.customer).post('/djangoapp/api/cart/checkout').json()
+        self.assertEqual(body['status'], 400)
+        self.assertEqual(sum(Product.objects.values_list('reserved_quantity', flat=True)), 0)
+        self.assertEqual(CartItem.objects.filter(customer=self.customer).count(), 3)
+
+    def test_reserve_many_is_conditional_per_product(self):
+        first, second = self.products[:2]
+        Product.objects.filter(pk=second.pk).update(stock_quantity=1)
+        self.assertTrue(inventory.reserve_many({first.pk: 5, second.pk: 1}))
+        self.assertFalse(inventory.reserve_many({first.pk: 5, second.pk: 1}))
+
+    def test_bulk_approval_settles_a_short_product_on_its_own(self):
+        # Two orders of one product with stock for only one, one order of another
+        extra = Order.objects.create(
+            customer=self.customer, product=self.orders[0].product, quantity=1,
+            date_purchased=self.orders[0].date_purchased, transaction_id='TXNTESTEXTRA',
+        )
+        Product.objects.filter(pk=self.orders[0].product_id).update(stock_quantity=1)
+        order_ids = [self.orders[0].pk, extra.pk, self.orders[1].pk]
+
+        body = self.client_for(self.manager).post(
+            '/djangoapp/api/manager/orders/process/bulk',
+            data=json.dumps({'order_ids': order_ids, 'action': 'approve'}), content_type='application/json',
+        ).json()
+        results = {row['order_id']: row['result'] for row in body['results']}
+        self.assertEqual(results, {
+            self.orders[0].pk: 'approved', extra.pk: 'insufficient_stock', self.orders[1].pk: 'approved',
+        })
+        self.assertEqual(Product.objects.get(pk=self.orders[0].product_id).stock_quantity, 0)
+        self.assertEqual(Product.objects.get(pk=self.orders[1].product_id).stock_quantity, 49)
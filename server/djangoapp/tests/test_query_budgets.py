@@ -0,0 +1,85 @@
+"""
+Query budgets of the endpoints in settings.QUERY_BUDGETS.
+
+Every request is made as an authenticated user on a cold cache, the worst
+case the budgets are written for, inside assert_max_queries. That fails on
+a blown budget and on any query shape repeated often enough to be an N+1.
+"""
+import json
+
+from django.conf import settings
+from django.urls import resolve
+
+from djangoapp import urls
+from djangoapp.models import Order
+from djangoapp.querycount import assert_max_queries
+
+from .base import ShopTestCase
+
+
+class QueryBudgetTests(ShopTestCase):
+
+    def assertWithinBudget(self, user, method, path, **kwargs):
+        """Request path as user within its view's budget; returns the decoded JSON body"""
+        view_name = resolve(path.split('?')[0]).view_name
+        self.assertIn(view_name, settings.QUERY_BUDGETS, f"{path} has no query budget")
+
+        client = self.client_for(user)
+        with assert_max_queries(settings.QUERY_BUDGETS[view_name]):
+            response = getattr(client, method)(path, **kwargs)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        body = json.loads(content)
+        self.assertEqual(body['status'], 200, body)
+        return body
+
+    def post_json(self, user, path, data):
+        return self.assertWithinBudget(user, 'post', path, data=json.dumps(data), content_type='application/json')
+
+    def test_every_budget_names_a_route(self):
+        route_names = {f"{urls.app_name}:{pattern.name}" for pattern in urls.urlpatterns if pattern.name}
+        self.assertEqual(set(settings.QUERY_BUDGETS) - route_names, set())
+
+    def test_catalog(self):
+        self.assertWithinBudget(self.customer, 'get', '/djangoapp/api/products?category=Laptops&in_stock=true')
+        self.assertWithinBudget(self.customer, 'get', f'/djangoapp/api/products/{self.products[0].pk}')
+        self.assertWithinBudget(self.customer, 'get', '/djangoapp/api/products/categories')
+
+    def test_customer_listings(self):
+        for path in ('orders', 'reviews', 'tickets'):
+            self.assertWithinBudget(self.customer, 'get', f'/djangoapp/api/customer/{path}')
+        self.assertWithinBudget(self.customer, 'get', '/djangoapp/api/reviews/public')
+
+    def test_demo_users(self):
+        for username in ('demo_customer', 'demo_admin', 'demo_support'):
+            self.create_user(username, 'customer')
+        self.assertWithinBudget(self.customer, 'get', '/djangoapp/api/demo-users')
+
+    def test_cart(self):
+        self.post_json(self.customer, '/djangoapp/api/cart/add', {'product_id': self.products[0].pk, 'quantity': 1})
+        self.fill_cart(self.customer, lines=5)
+        body = self.assertWithinBudget(self.customer, 'get', '/djangoapp/api/cart')
+        self.assertEqual(body['item_count'], 6)
+
+    def test_checkout_cost_does_not_grow_with_the_cart(self):
+        self.fill_cart(self.customer, lines=8)
+        body = self.assertWithinBudget(
+            self.customer, 'post', '/djangoapp/api/cart/checkout', HTTP_IDEMPOTENCY_KEY='checkout-1'
+        )
+        self.assertEqual(len(body['orders']), 8)
+        # The retry replays the stored response
+        replay = self.assertWithinBudget(
+            self.customer, 'post', '/djangoapp/api/cart/checkout', HTTP_IDEMPOTENCY_KEY='checkout-1'
+        )
+        self.assertEqual(replay['transaction_id'], body['transaction_id'])
+
+    def test_management_listings(self):
+        for path in ('inventory', 'orders/pending', 'orders/all', 'reviews', 'tickets'):
+            self.assertWithinBudget(self.manager, 'get', f'/djangoapp/api/manager/{path}')
+
+    def test_order_processing(self):
+        self.post_json(self.manager, '/djangoapp/api/manager/orders/process',
+                       {'order_id': self.orders[0].pk, 'action': 'approve'})
+        body = self.post_json(self.manager, '/djangoapp/api/manager/orders/process/bulk',
+                              {'order_ids': [order.pk for order in self.orders[1:]], 'action': 'approve'})
+        self.assertEqual(body['summary'], {'approved': 3})
+        self.assertEqual(Order.objects.filter(status='approved').count(), 4)
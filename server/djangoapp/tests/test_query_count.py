@@ -0,0 +1,32 @@
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.test import AsyncClient, override_settings
+
+from djangoapp import restapis
+from djangoapp.middleware import QueryCountMiddleware
+
+from .base import ShopTestCase
+
+
+@override_settings(DEBUG=True, QUERY_COUNT_ENABLED=True)
+class QueryCountMiddlewareTests(ShopTestCase):
+
+    def test_async_chain_stays_async(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(QueryCountMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(QueryCountMiddleware(lambda request: None)))
+
+    def test_sync_view_queries_are_counted(self):
+        response = self.client.get(f'/djangoapp/api/products/{self.products[0].pk}')
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    async def test_async_view_queries_are_counted(self):
+        reviews = mock.AsyncMock(return_value=[{'review': 'Fine', 'sentiment': 'positive'}])
+        with mock.patch.object(restapis, 'async_get_request', reviews):
+            response = await AsyncClient().get(f'/djangoapp/api/products/{self.products[0].pk}/reviews')
+        self.assertEqual(response.json()['status'], 200)
+        # The product lookup, run by the ORM on a sync_to_async thread
+        self.assertEqual(response['X-Query-Count'], '1')
@@ -0,0 +1,82 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot endpoints.
+
+Each endpoint is called through the test client while its SQL is recorded,
+and the plan of every SELECT it actually ran is checked: no full table
+scans, and listings must be served in index order rather than sorted in a
+temp B-tree. Because the SQL comes from the views themselves, a change to a
+view's query is checked as soon as it is made.
+"""
+import re
+import unittest
+
+from django.db import connection
+
+from .base import ShopTestCase
+
+# SQLite reports a full table scan as "SCAN <table>" (or "SCAN TABLE <table>"
+# on older versions) without a "USING ... INDEX" clause
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?! USING)(?:\s|$)')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return "\n".join(row[-1] for row in cursor.fetchall())
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plan checks read SQLite EXPLAIN QUERY PLAN output')
+class QueryPlanTests(ShopTestCase):
+
+    def assertIndexedPlans(self, user, path, sorted=True):
+        """
+        Request path as user and check the plan of every SELECT it ran.
+        With sorted, ORDER BY clauses must be served by an index.
+        """
+        response, recorder = self.record(self.client_for(user), 'get', path)
+        self.assertEqual(response.status_code, 200, path)
+
+        selects = [(sql, params) for sql, params, many in recorder.statements
+                   if not many and sql.lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects, f"{path} ran no SELECT")
+
+        problems = []
+        for sql, params in selects:
+            plan = explain(sql, params)
+            found = [f'full scan of {table}' for table in FULL_SCAN.findall(plan)]
+            if sorted and TEMP_SORT in plan:
+                found.append('ORDER BY not served by an index')
+            if found:
+                problems.append(f"{', '.join(found)}\n    {sql}\n    {plan}")
+        if problems:
+            self.fail(f"{path}:\n" + "\n".join(problems))
+        return response
+
+    def test_catalog(self):
+        response = self.assertIndexedPlans(None, '/djangoapp/api/products?limit=3')
+        cursor = response.json()['next_cursor']
+        self.assertIndexedPlans(None, f'/djangoapp/api/products?limit=3&cursor={cursor}')
+        self.assertIndexedPlans(None, '/djangoapp/api/products?category=Laptops')
+        self.assertIndexedPlans(None, '/djangoapp/api/products?category=Laptops&min_price=101&in_stock=true')
+        self.assertIndexedPlans(None, '/djangoapp/api/products/categories', sorted=False)
+        self.assertIndexedPlans(None, f'/djangoapp/api/products/{self.products[0].pk}')
+
+    def test_customer_listings(self):
+        self.assertIndexedPlans(self.customer, '/djangoapp/api/customer/orders')
+        self.assertIndexedPlans(self.customer, '/djangoapp/api/customer/reviews')
+        self.assertIndexedPlans(self.customer, '/djangoapp/api/customer/tickets')
+        self.assertIndexedPlans(self.customer, '/djangoapp/api/reviews/public')
+        self.assertIndexedPlans(self.customer, f'/djangoapp/api/order-by-transaction/{self.orders[0].transaction_id}')
+
+    def test_cart(self):
+        self.fill_cart(self.customer)
+        # A cart is a handful of rows, sorting them in memory is fine
+        self.assertIndexedPlans(self.customer, '/djangoapp/api/cart', sorted=False)
+
+    def test_management_listings(self):
+        self.assertIndexedPlans(self.manager, '/djangoapp/api/manager/inventory')
+        self.assertIndexedPlans(self.manager, '/djangoapp/api/manager/orders/pending')
+        self.assertIndexedPlans(self.manager, '/djangoapp/api/manager/orders/all')
+        self.assertIndexedPlans(self.manager, '/djangoapp/api/manager/reviews')
+        self.assertIndexedPlans(self.manager, '/djangoapp/api/manager/tickets')
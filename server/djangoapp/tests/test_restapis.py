@@ -0,0 +1,154 @@
+"""
+The pooled HTTP client in restapis, against a local stub standing in for the
+Express backend and the sentiment analyzer.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from django.test import SimpleTestCase
+
+from djangoapp import restapis
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Stand-in for the Express backend and the sentiment analyzer"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out and went away
+            pass
+
+    def do_GET(self):
+        stub = self.server
+        url = urlsplit(self.path)
+        stub.hits[url.path] = stub.hits.get(url.path, 0) + 1
+        stub.client_ports.add(self.client_address[1])
+
+        if url.path == '/echo':
+            self._reply(200, {'params': {key: values[0] for key, values in parse_qs(url.query).items()}})
+        elif url.path == '/flaky':
+            # Fails twice, then recovers
+            if stub.hits[url.path] <= 2:
+                self._reply(503, {'error': 'unavailable'})
+            else:
+                self._reply(200, {'recovered': True})
+        elif url.path == '/slow':
+            time.sleep(1)
+            self._reply(200, {'too': 'late'})
+        elif url.path in ('/catalog', '/down'):
+            if stub.down or url.path == '/down':
+                self._reply(503, {'error': 'unavailable'})
+            else:
+                self._reply(200, {'catalog': parse_qs(url.query).get('page', ['1'])[0]})
+        elif url.path.startswith('/analyze/'):
+            self._reply(200, {'label': 'positive', 'text': unquote(url.path[len('/analyze/'):])})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        stub = self.server
+        stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply(503, {'error': 'unavailable'})
+
+
+class HTTPClientTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.stub_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.hits = {}
+        self.server.client_ports = set()
+        self.server.down = False
+        self.enterContext(mock.patch.multiple(
+            restapis, backend_url=self.stub_url, sentiment_analyzer_url=self.stub_url, HTTP_READ_TIMEOUT=0.25,
+            breakers={'backend': restapis.CircuitBreaker(), 'sentiment': restapis.CircuitBreaker()},
+        ))
+        # Upstream failures are expected here; keep their warnings out of the output
+        self.enterContext(mock.patch.object(restapis, 'logger'))
+        restapis.upstream_stats.reset()
+        restapis.fallback_cache.clear()
+        self.addCleanup(restapis.fallback_cache.clear)
+
+    def test_query_parameters_are_url_encoded(self):
+        params = {'dealer': 'a&b=c d', 'state': 'Ñew York'}
+        self.assertEqual(restapis.get_request('/echo', **params), {'params': params})
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            restapis.get_request('/echo')
+        self.assertEqual(self.server.hits['/echo'], 5)
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_get_is_retried_after_503(self):
+        self.assertEqual(restapis.get_request('/flaky'), {'recovered': True})
+        self.assertEqual(self.server.hits['/flaky'], 3)
+
+    def test_post_is_not_retried(self):
+        self.assertIsNone(restapis.post_review({'review': 'x'}))
+        self.assertEqual(self.server.hits['/insert_review'], 1)
+
+    def test_hung_upstream_times_out(self):
+        started = time.perf_counter()
+        self.assertIsNone(restapis.get_request('/slow'))
+        self.assertLess(time.perf_counter() - started, 3)
+
+    def test_review_text_is_path_encoded(self):
+        text = 'Great / product? 100% & more'
+        self.assertEqual(restapis.analyze_review_sentiments(text)['text'], text)
+
+    def test_errors_are_counted_per_upstream(self):
+        restapis.get_request('/echo')
+        restapis.get_request('/down')
+        restapis.analyze_review_sentiments('fine')
+        stats = restapis.stats()
+        self.assertEqual((stats['backend']['calls'], stats['backend']['errors']), (2, 1))
+        self.assertEqual((stats['sentiment']['calls'], stats['sentiment']['errors']), (1, 0))
+
+    def test_last_good_response_is_served_while_the_backend_fails(self):
+        good = restapis.get_request('/catalog', page=2)
+        self.server.down = True
+        self.assertEqual(restapis.get_request('/catalog', page=2), good)
+        self.assertIsNone(restapis.get_request('/catalog', page=3))
+
+    def test_circuit_opens_fails_fast_and_recovers(self):
+        breaker = restapis.CircuitBreaker(failure_threshold=2, reset_timeout=0.5)
+        restapis.breakers['backend'] = breaker
+        restapis.get_request('/down')
+        restapis.get_request('/down')
+        self.assertEqual(breaker.snapshot()['state'], 'open')
+
+        hits = self.server.hits['/down']
+        self.assertIsNone(restapis.get_request('/down'))
+        self.assertEqual(self.server.hits['/down'], hits, "an open circuit sends no request")
+
+        time.sleep(0.5)
+        self.assertEqual(restapis.get_request('/catalog', page=4), {'catalog': '4'})
+        self.assertEqual(breaker.snapshot()['state'], 'closed')
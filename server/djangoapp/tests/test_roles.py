@@ -0,0 +1,44 @@
+from djangoapp.models import UserProfile
+
+from .base import ShopTestCase
+
+PENDING_ORDERS = '/djangoapp/api/manager/orders/pending'
+
+
+class RoleTests(ShopTestCase):
+
+    def test_demotion_applies_to_existing_sessions(self):
+        client = self.client_for(self.manager)
+        self.assertEqual(client.get(PENDING_ORDERS).json()['status'], 200)
+
+        # A queryset update skips signals, like an edit made by another process
+        UserProfile.objects.filter(user=self.manager).update(role='customer')
+        response = client.get(PENDING_ORDERS)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['status'], 403)
+
+    def test_removed_profile_loses_access(self):
+        client = self.client_for(self.manager)
+        self.assertEqual(client.get(PENDING_ORDERS).json()['status'], 200)
+
+        UserProfile.objects.filter(user=self.manager).delete()
+        self.assertEqual(client.get(PENDING_ORDERS).json()['status'], 403)
+
+    def test_anonymous_requests_get_http_401(self):
+        response = self.client.get(PENDING_ORDERS)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['status'], 401)
+
+    def test_other_roles_get_http_403(self):
+        response = self.client_for(self.customer).get(PENDING_ORDERS)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client_for(self.manager).get(PENDING_ORDERS).status_code, 200)
+
+    def test_role_is_loaded_with_the_user(self):
+        client = self.client_for(self.manager)
+        response, recorder = self.record(client, 'get', PENDING_ORDERS)
+        self.assertEqual(response.json()['status'], 200)
+        self.assertFalse(
+            [sql for sql in recorder.queries if 'FROM "djangoapp_userprofile"' in sql],
+            "the role should come from the user query, not a query of its own",
+        )
@@ -0,0 +1,109 @@
+"""
+The sentiment analyzer's IAM token cache, against a local stub IAM server
+that issues numbered tokens after a short delay and counts requests.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from djangoapp.microservices import sentiment_analyzer as sa
+
+
+class StubIAM(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubIAMHandler)
+        self.requests = 0
+        self.expires_in = 3600
+        self.failing = False
+        self.lock = threading.Lock()
+
+
+class StubIAMHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with stub.lock:
+            stub.requests += 1
+            number = stub.requests
+        time.sleep(0.2)
+        if stub.failing:
+            status, body = 500, {'errorMessage': 'unavailable'}
+        else:
+            status, body = 200, {'access_token': f'token-{number}', 'expires_in': stub.expires_in}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def concurrently(count, target):
+    """Call target from count threads at once; returns the results and durations"""
+    results = [None] * count
+    durations = [0.0] * count
+
+    def work(i):
+        started = time.perf_counter()
+        results[i] = target()
+        durations[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, durations
+
+
+class TokenCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.stub = StubIAM()
+        threading.Thread(target=self.stub.serve_forever, daemon=True).start()
+        self.addCleanup(self.stub.server_close)
+        self.addCleanup(self.stub.shutdown)
+        self.enterContext(mock.patch.object(sa, 'IAM_URL', f'http://127.0.0.1:{self.stub.server_address[1]}/identity/token'))
+        self.cache = sa.TokenCache(sa.fetch_access_token, refresh_margin=1.0)
+
+    def test_concurrent_first_calls_share_one_request(self):
+        results, _ = concurrently(50, lambda: self.cache.get('key'))
+        self.assertEqual(self.stub.requests, 1)
+        self.assertEqual(set(results), {'token-1'})
+
+        for _ in range(100):
+            self.cache.get('key')
+        self.assertEqual(self.stub.requests, 1, "a cached token is reused")
+
+    def test_refresh_before_expiry_and_after_failures(self):
+        self.stub.expires_in = 3
+        self.assertEqual(self.cache.get('key'), 'token-1')
+
+        # Inside the refresh margin: one caller refreshes, the rest keep the old token
+        time.sleep(2.1)
+        results, durations = concurrently(20, lambda: self.cache.get('key'))
+        self.assertEqual(self.stub.requests, 2)
+        self.assertEqual(sum(1 for duration in durations if duration > 0.1), 1)
+        self.assertIn('token-1', results)
+        self.assertEqual(self.cache.get('key'), 'token-2')
+
+        # A failed refresh keeps the token that is still valid
+        self.stub.failing = True
+        time.sleep(2.1)
+        self.assertEqual(self.cache.get('key'), 'token-2')
+
+        # Once it has expired, a single refresh replaces it
+        time.sleep(1.0)
+        self.stub.failing = False
+        results, _ = concurrently(20, lambda: self.cache.get('key'))
+        self.assertEqual(self.stub.requests, 4)
+        self.assertEqual(set(results), {'token-4'})
@@ -21,12 +21,12 @@ urlpatterns = [
     path(route='register', view=views.register_user, name='register'),
 
     # Customer endpoints
-    path("api/customer/orders", views.get_customer_orders),
-    path("api/customer/reviews", views.get_customer_reviews),
-    path("api/customer/tickets", views.get_customer_tickets),
+    path("api/customer/orders", views.get_customer_orders, name='get_customer_orders'),
+    path("api/customer/reviews", views.get_customer_reviews, name='get_customer_reviews'),
+    path("api/customer/tickets", views.get_customer_tickets, name='get_customer_tickets'),
     path("api/customer/review", views.post_review),  # Legacy product-specific review
     path("api/customer/review/experience", views.post_experience_review),  # New shopping experience review
-    path("api/reviews/public", views.get_public_reviews),  # Public reviews for all customers to see
+    path("api/reviews/public", views.get_public_reviews, name='get_public_reviews'),  # Public reviews for all customers to see
     path("api/customer/support/new", views.submit_support_ticket),
     
     # Admin endpoints
@@ -43,13 +43,15 @@ urlpatterns = [
     
     # Utility endpoints
     path("api/order-by-transaction/<str:transaction_id>", views.get_order_by_transaction),
-    path("api/demo-users", views.get_demo_users),
+    path("api/demo-users", views.get_demo_users, name='get_demo_users'),
     path("api/init-demo-data", views.init_demo_data),
     
     # Product endpoints
     path("api/products", views.get_products, name='get_products'),
     path("api/products/<int:product_id>", views.get_product_detail, name='get_product_detail'),
     path("api/products/categories", views.get_product_categories, name='get_categories'),
+    path("api/products/<int:product_id>/reviews", views.get_product_reviews, name='get_product_reviews'),
+    path("api/products/<int:product_id>/reviews/new", views.post_product_review, name='post_product_review'),
     
     # Cart endpoints
     path("api/cart", views.get_cart, name='get_cart'),
@@ -62,9 +64,11 @@ urlpatterns = [
     path("api/manager/orders/pending", views.get_pending_orders, name='get_pending_orders'),
     path("api/manager/orders/all", views.get_all_orders_for_management, name='get_all_orders_management'),
     path("api/manager/orders/process", views.process_order, name='process_order'),
+    path("api/manager/orders/process/bulk", views.process_orders_bulk, name='process_orders_bulk'),
     path("api/manager/inventory", views.get_inventory_overview, name='get_inventory'),
     path("api/manager/reviews", views.get_reviews_for_management, name='get_reviews_management'),
     path("api/manager/tickets", views.get_tickets_for_management, name='get_tickets_management'),
+    path("api/manager/export/<str:table>", views.export_table, name='export_table'),
 
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
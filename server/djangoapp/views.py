@@ -5,20 +5,32 @@ from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
-from django.db import connection
-from django.db.models import Sum
+from django.db import transaction, IntegrityError
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, F, ExpressionWrapper, BooleanField
 from django.core.management import call_command
+from django.utils import timezone
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import asyncio
+import base64
+import binascii
+import hashlib
 import logging
 import json
 import traceback
 import os
 
+from . import catalog_cache, exports, inventory, jobs, restapis, streaming
+from .ids import new_transaction_id
+from .roles import require_role, remember_role
+from .routers import read_replica
 from .restapis import get_request, analyze_review_sentiments, post_review
-from .models import UserProfile, Product, Order, Review, SupportTicket, CartItem
+from .models import UserProfile, Product, Order, Review, SupportTicket, CartItem, IdempotencyKey
 
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
@@ -29,7 +41,12 @@ def health_check(request):
     Basic health check endpoint for monitoring service availability.
     Used by Render for health checks.
     """
-    return JsonResponse({'status': 'ok', 'message': 'Service is healthy'})
+    return JsonResponse({
+        'status': 'ok',
+        'message': 'Service is healthy',
+        'catalog_cache': catalog_cache.stats(),
+        'upstreams': restapis.stats()
+    })
 
 # Home view to serve the React application
 def home(request):
@@ -110,8 +127,10 @@ def login_user(request):
                 try:
                     profile = UserProfile.objects.get(user=user)
                     user_role = profile.get_role_display()  # This returns the display value (e.g., "Manager")
+                    remember_role(request, profile.role.lower())
                 except UserProfile.DoesNotExist:
                     user_role = "Customer"
+                    remember_role(request, None)
                 
                 return JsonResponse({
                     "status": 200, 
@@ -155,7 +174,8 @@ def register_user(request):
             # Create user profile with default Customer role
             profile = UserProfile.objects.create(user=user, role="customer")
             
-            login(request, user)
+            login(request, user, backend='djangoapp.backends.ProfileBackend')
+            remember_role(request, "customer")
             return JsonResponse({
                 "status": 201, 
                 "userName": user.username,
@@ -248,34 +268,20 @@ def submit_support_ticket(request):
         return JsonResponse({"status": 405, "error": "Method not allowed", "message": "Only POST method is supported"})
 
 @login_required
+@require_role('manager', 'admin')
 def get_all_orders(request):
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role.lower() not in ["manager", "admin"]:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "message": "Access denied"})
-
     orders = Order.objects.select_related("customer", "product")
-    results = [
-        {
-            "customer": order.customer.username,
-            "product": order.product.name,
-            "transaction_id": order.transaction_id,
-            "date": order.date_purchased,
-        } for order in orders
-    ]
-    return JsonResponse({"status": 200, "orders": results})
+    results = streaming.iterate(orders, lambda order: {
+        "customer": order.customer.username,
+        "product": order.product.name,
+        "transaction_id": order.transaction_id,
+        "date": order.date_purchased,
+    })
+    return streaming.list_response(request, "orders", results)
 
 @login_required
+@require_role('manager', 'admin', 'support')
 def get_support_tickets(request):
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role.lower() not in ["manager", "admin", "support"]:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "message": "Access denied"})
-
     tickets = SupportTicket.objects.select_related("customer", "product")
     results = [
         {
@@ -293,14 +299,8 @@ def get_support_tickets(request):
 
 @csrf_exempt
 @login_required
+@require_role('manager', 'admin', 'support')
 def update_ticket_status(request, ticket_id):
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role.lower() not in ["manager", "admin", "support"]:
-            return JsonResponse({"status": 403})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403})
-
     if request.method == "POST":
         data = json.loads(request.body)
         status = data.get("status")
@@ -317,7 +317,7 @@ def get_demo_users(request):
         try:
             # Get only the 3 specific demo users
             demo_usernames = ['demo_customer', 'demo_admin', 'demo_support']
-            users = User.objects.filter(username__in=demo_usernames)
+            users = User.objects.filter(username__in=demo_usernames).select_related('userprofile')
             
             # If no demo users exist, create them
             if not users.exists():
@@ -325,7 +325,7 @@ def get_demo_users(request):
                     from .populate import initiate
                     initiate()
                     # Re-fetch users after initialization
-                    users = User.objects.filter(username__in=demo_usernames)
+                    users = User.objects.filter(username__in=demo_usernames).select_related('userprofile')
                 except Exception as init_error:
                     # If initialization fails, return default demo users
                     return JsonResponse({
@@ -355,7 +355,7 @@ def get_demo_users(request):
             demo_users = []
             for user in users:
                 try:
-                    profile = UserProfile.objects.get(user=user)
+                    profile = user.userprofile
                     # Convert database role to display format
                     role_display = profile.get_role_display()
                     demo_users.append({
@@ -447,7 +447,7 @@ def get_customer_reviews(request):
 
 from .models import SupportTicket, Product
 
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_POST
 
 @require_GET
 def get_customer_tickets(request):
@@ -490,18 +490,8 @@ def get_order_by_transaction(request, transaction_id):
         return JsonResponse({"status": 404, "error": "Order not found"}, status=404)
 
 @require_GET
+@require_role('manager', 'admin')
 def get_all_reviews(request):
-    if not request.user.is_authenticated:
-        return JsonResponse({"status": 401, "error": "Unauthorized"}, status=401)
-    
-    # Check if user has admin or manager role
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role.lower() not in ['admin', 'manager']:
-            return JsonResponse({"status": 403, "error": "Forbidden"}, status=403)
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "error": "Forbidden"}, status=403)
-    
     # Get all reviews with related customer and product info
     reviews = Review.objects.select_related('customer', 'product').order_by('-created_on')
     review_list = [
@@ -520,14 +510,8 @@ def get_all_reviews(request):
 
 @require_GET
 @login_required
+@require_role('manager', 'admin', 'support')
 def get_ticket_detail(request, ticket_id):
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role.lower() not in ["manager", "admin", "support"]:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "message": "Access denied"})
-
     try:
         ticket = SupportTicket.objects.select_related("customer", "product").get(id=ticket_id)
         ticket_data = {
@@ -546,14 +530,8 @@ def get_ticket_detail(request, ticket_id):
 
 @csrf_exempt
 @login_required
+@require_role('manager', 'admin', 'support')
 def update_ticket_detail(request, ticket_id):
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role.lower() not in ["manager", "admin", "support"]:
-            return JsonResponse({"status": 403})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403})
-
     if request.method == "POST":
         try:
             data = json.loads(request.body)
@@ -574,133 +552,145 @@ def update_ticket_detail(request, ticket_id):
         return JsonResponse({"status": 405, "message": "Method not allowed"})
 
 # Product API Views
+PRODUCTS_DEFAULT_PAGE_SIZE = 50
+PRODUCTS_MAX_PAGE_SIZE = 200
+
+def serialize_product(product):
+    """Build the JSON-ready dict for a single product"""
+    return {
+        "id": product.id,
+        "name": product.name,
+        "category": product.category,
+        "price": float(product.price),
+        "description": product.description,
+        "stock_quantity": product.stock_quantity,
+        "is_in_stock": product.is_in_stock,
+        "image_url": product.image_url,
+        "created_at": product.created_at.isoformat()
+    }
+
+def encode_product_cursor(product):
+    """Encode the (name, id) keyset position of a product as an opaque cursor"""
+    payload = json.dumps([product.name, product.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def decode_product_cursor(cursor):
+    """Decode a cursor produced by encode_product_cursor into (name, id)"""
+    try:
+        name, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(name), int(product_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+def parse_price(value):
+    """Parse a price filter value, rejecting malformed and non-finite numbers"""
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError("Invalid price filter")
+    # NaN and Infinity parse as Decimals but can't be compared with a price
+    if not price.is_finite():
+        raise ValueError("Invalid price filter")
+    return price
+
+def filter_products(params):
+    """
+    Apply the catalog filters from the query string to the active products.
+    Supported filters: category, min_price, max_price and in_stock.
+    Raises ValueError for malformed filter values.
+    """
+    products = Product.objects.filter(is_active=True)
+
+    category = params.get('category')
+    if category:
+        products = products.filter(category=category)
+
+    try:
+        if params.get('min_price'):
+            products = products.filter(price__gte=parse_price(params['min_price']))
+        if params.get('max_price'):
+            products = products.filter(price__lte=parse_price(params['max_price']))
+    except ValidationError:
+        # Finite but not storable in the price column, e.g. too many digits
+        raise ValueError("Invalid price filter")
+
+    in_stock = params.get('in_stock', '').lower()
+    if in_stock in ('1', 'true', 'yes'):
+        products = products.filter(stock_quantity__gt=0)
+    elif in_stock in ('0', 'false', 'no'):
+        products = products.filter(stock_quantity__lte=0)
+
+    return products
+
+def paginate_products(products, params):
+    """
+    Keyset-paginate a product queryset on (name, id).
+    Returns the page of products and the cursor for the next page (or None).
+    """
+    try:
+        limit = int(params.get('limit', PRODUCTS_DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("Invalid limit")
+    limit = max(1, min(limit, PRODUCTS_MAX_PAGE_SIZE))
+
+    cursor = params.get('cursor')
+    if cursor:
+        last_name, last_id = decode_product_cursor(cursor)
+        # The leading name >= bound lets the (name, id) index seek straight to the cursor
+        products = products.filter(Q(name__gte=last_name), Q(name__gt=last_name) | Q(id__gt=last_id))
+
+    # Fetch one extra row to know whether another page exists
+    page = list(products.order_by('name', 'id')[:limit + 1])
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_product_cursor(page[-1])
+    return page, next_cursor
+
 @require_GET
 def get_products(request):
-    """Get all active products with inventory information"""
+    """
+    Get a page of active products with inventory information.
+
+    Query parameters:
+        cursor     -- opaque cursor returned as next_cursor by the previous page
+        limit      -- page size (default 50, max 200)
+        category   -- only products in this category
+        min_price  -- only products priced at or above this value
+        max_price  -- only products priced at or below this value
+        in_stock   -- 'true' for products in stock, 'false' for sold out ones
+    """
     try:
-        products_data = []
-        
-        # Simplified approach - try to query products directly
-        try:
-            products = Product.objects.filter(is_active=True).order_by('name')
-            logger.info(f"Found {products.count()} products")
-            
-            for product in products:
-                products_data.append({
-                    "id": product.id,
-                    "name": product.name,
-                    "category": product.category,
-                    "price": float(product.price),
-                    "description": product.description,
-                    "stock_quantity": product.stock_quantity,
-                    "is_in_stock": product.is_in_stock,
-                    "image_url": product.image_url,
-                    "created_at": product.created_at.isoformat()
-                })
-            
-            return JsonResponse({"status": 200, "products": products_data})
-        
-        except Exception as model_error:
-            logger.error(f"Error querying Products model: {str(model_error)}")
-            logger.error(traceback.format_exc())
-            
-            # Fallback: Try to query directly from the database
-            logger.info("Attempting to query products directly from database...")
-            
-            try:
-                with connection.cursor() as cursor:
-                    # Check if table exists
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='djangoapp_product'")
-                    if not cursor.fetchone():
-                        return JsonResponse({
-                            "status": 500, 
-                            "message": "Product table does not exist. Please contact support."
-                        })
-                    
-                    # Query products directly
-                    cursor.execute("SELECT id, name, category, price, description, stock_quantity, image_url, is_active FROM djangoapp_product WHERE is_active=1 ORDER BY name")
-                    raw_products = cursor.fetchall()
-                    logger.info(f"Found {len(raw_products)} products using raw SQL")
-                    
-                    for product in raw_products:
-                        products_data.append({
-                            "id": product[0],
-                            "name": product[1],
-                            "category": product[2],
-                            "price": float(product[3]),
-                            "description": product[4],
-                            "stock_quantity": product[5],
-                            "is_in_stock": product[5] > 0,
-                            "image_url": product[6],
-                            "created_at": "2025-01-01T00:00:00"  # Default date as we can't get it from the cursor
-                        })
-                    
-                    return JsonResponse({"status": 200, "products": products_data})
-                
-            except Exception as db_error:
-                logger.error(f"Direct database query failed: {str(db_error)}")
-                logger.error(traceback.format_exc())
-                
-                # Last resort: Return mock products to avoid client-side crashes
-                logger.info("Returning mock products as last resort")
-                return JsonResponse({
-                    "status": 200, 
-                    "products": [
-                        {
-                            "id": 1,
-                            "name": "Emergency Backup Product",
-                            "category": "Electronics",
-                            "price": 99.99,
-                            "description": "This is a backup product when database access fails.",
-                            "stock_quantity": 10,
-                            "is_in_stock": True,
-                            "image_url": "https://via.placeholder.com/300",
-                            "created_at": "2025-01-01T00:00:00"
-                        },
-                        {
-                            "id": 2,
-                            "name": "Fallback Product",
-                            "category": "Other",
-                            "price": 49.99,
-                            "description": "Another backup product when database access fails.",
-                            "stock_quantity": 5,
-                            "is_in_stock": True,
-                            "image_url": "https://via.placeholder.com/300",
-                            "created_at": "2025-01-01T00:00:00"
-                        }
-                    ],
-                    "database_status": "ERROR"
-                })
+        def build_page():
+            products = filter_products(request.GET)
+            page, next_cursor = paginate_products(products, request.GET)
+            return {
+                "status": 200,
+                "products": [serialize_product(product) for product in page],
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
+            }
+
+        content = catalog_cache.get_page(request.GET, build_page)
+        return HttpResponse(content, content_type='application/json')
+    except ValueError as e:
+        # Malformed cursor or filter values
+        return JsonResponse({"status": 400, "message": str(e)})
     except Exception as e:
-        error_details = traceback.format_exc()
-        logger.error(f"Critical error in get_products: {str(e)}\n{error_details}")
-        
-        # Return mock products even in case of critical error
-        return JsonResponse({
-            "status": 200, 
-            "products": [
-                {
-                    "id": 999,
-                    "name": "Critical Error Backup Product",
-                    "category": "Error",
-                    "price": 0.99,
-                    "description": "Emergency product shown when critical errors occur.",
-                    "stock_quantity": 1,
-                    "is_in_stock": True,
-                    "image_url": "https://via.placeholder.com/300",
-                    "created_at": "2025-01-01T00:00:00"
-                }
-            ],
-            "error": str(e),
-            "database_status": "CRITICAL_ERROR"
-        })
+        # No unfiltered fallback listing: a page is either correct or an error
+        logger.error(f"Error in get_products: {str(e)}\n{traceback.format_exc()}")
+        return JsonResponse({"status": 500, "message": "Could not load products"})
 
 @require_GET
 def get_product_categories(request):
     """Get all unique product categories"""
     try:
-        categories = Product.objects.filter(is_active=True).values_list('category', flat=True).distinct()
-        return JsonResponse({"status": 200, "categories": list(categories)})
+        def build_categories():
+            categories = Product.objects.filter(is_active=True).values_list('category', flat=True).distinct()
+            return {"status": 200, "categories": list(categories)}
+
+        content = catalog_cache.get_categories(build_categories)
+        return HttpResponse(content, content_type='application/json')
     except Exception as e:
         return JsonResponse({"status": 500, "message": str(e)})
 
@@ -708,25 +698,98 @@ def get_product_categories(request):
 def get_product_detail(request, product_id):
     """Get a single product by ID"""
     try:
-        product = get_object_or_404(Product, id=product_id, is_active=True)
-        product_data = {
-            "id": product.id,
-            "name": product.name,
-            "category": product.category,
-            "price": float(product.price),
-            "description": product.description,
-            "stock_quantity": product.stock_quantity,
-            "is_in_stock": product.is_in_stock,
-            "image_url": product.image_url,
-            "created_at": product.created_at.isoformat()
-        }
-        
-        return JsonResponse({"status": 200, "product": product_data})
+        def build_product():
+            product = get_object_or_404(Product, id=product_id, is_active=True)
+            return {"status": 200, "product": serialize_product(product)}
+
+        content = catalog_cache.get_product(product_id, build_product)
+        return HttpResponse(content, content_type='application/json')
     except Product.DoesNotExist:
         return JsonResponse({"status": 404, "message": "Product not found"})
     except Exception as e:
         return JsonResponse({"status": 500, "message": str(e)})
 
+# Product reviews are stored by the Express backend. These views are async so
+# that, under ASGI, a worker keeps serving other requests while the upstream
+# services respond, and independent calls run concurrently.
+
+# Sentiment requests one view may have in flight at once
+REVIEW_SCORING_CONCURRENCY = 10
+
+def sentiment_label(result):
+    """The label of a sentiment analyzer response, 'neutral' if unavailable"""
+    if isinstance(result, dict) and result.get('label'):
+        return result['label']
+    return 'neutral'
+
+async def score_reviews(reviews):
+    """Fill in missing sentiment labels, querying the analyzer concurrently"""
+    semaphore = asyncio.Semaphore(REVIEW_SCORING_CONCURRENCY)
+
+    async def score(review):
+        async with semaphore:
+            result = await restapis.async_analyze_review_sentiments(review.get('review', ''))
+        review['sentiment'] = sentiment_label(result)
+
+    await asyncio.gather(*(score(review) for review in reviews if not review.get('sentiment')))
+
+@require_GET
+async def get_product_reviews(request, product_id):
+    """Get a product with its reviews from the Express backend"""
+    product, reviews = await asyncio.gather(
+        Product.objects.filter(id=product_id, is_active=True).afirst(),
+        restapis.async_get_request(f"/fetchReviews/product/{product_id}"),
+    )
+    if product is None:
+        return JsonResponse({"status": 404, "message": "Product not found"})
+    if not isinstance(reviews, list):
+        return JsonResponse({"status": 503, "message": "Reviews are temporarily unavailable"})
+
+    await score_reviews(reviews)
+    return JsonResponse({"status": 200, "product": serialize_product(product), "reviews": reviews})
+
+@csrf_exempt
+@require_POST
+async def post_product_review(request, product_id):
+    """
+    Post a product review to the Express backend.
+    Looks up the product and the customer's purchase while the sentiment
+    analyzer scores the text, then stores the review with its sentiment.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"status": 401, "message": "Authentication required"})
+
+    try:
+        data = json.loads(request.body)
+        review_text = data['review']
+        rating = int(data['rating'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"status": 400, "message": "review and rating are required"})
+
+    product, purchase, sentiment = await asyncio.gather(
+        Product.objects.filter(id=product_id, is_active=True).afirst(),
+        Order.objects.filter(customer=user, product_id=product_id, status='approved')
+             .order_by('-date_purchased').afirst(),
+        restapis.async_analyze_review_sentiments(review_text),
+    )
+    if product is None:
+        return JsonResponse({"status": 404, "message": "Product not found"})
+
+    saved = await restapis.async_post_review({
+        "name": user.get_full_name() or user.username,
+        "product_id": product.id,
+        "product_name": product.name,
+        "review": review_text,
+        "rating": rating,
+        "purchase": purchase is not None,
+        "purchase_date": purchase.date_purchased.isoformat() if purchase else "",
+        "sentiment": sentiment_label(sentiment),
+    })
+    if saved is None:
+        return JsonResponse({"status": 503, "message": "Reviews are temporarily unavailable"})
+    return JsonResponse({"status": 200, "message": "Review posted.", "review": saved})
+
 # Cart API Views
 @csrf_exempt
 def cart_add_item(request):
@@ -746,11 +809,12 @@ def cart_add_item(request):
             except Product.DoesNotExist:
                 return JsonResponse({"status": 404, "message": "Product not found"})
             
-            # Check stock availability
-            if quantity > product.stock_quantity:
+            # Check stock availability, excluding stock held by pending orders
+            available = product.available_quantity
+            if quantity > available:
                 return JsonResponse({
                     "status": 400, 
-                    "message": f"Only {product.stock_quantity} items available in stock"
+                    "message": f"Only {max(available, 0)} items available in stock"
                 })
             
             # Add or update cart item
@@ -763,10 +827,10 @@ def cart_add_item(request):
             if not created:
                 # Update existing cart item
                 new_quantity = cart_item.quantity + quantity
-                if new_quantity > product.stock_quantity:
+                if new_quantity > available:
                     return JsonResponse({
                         "status": 400, 
-                        "message": f"Cannot add {quantity} more. Only {product.stock_quantity - cart_item.quantity} more available"
+                        "message": f"Cannot add {quantity} more. Only {max(available - cart_item.quantity, 0)} more available"
                     })
                 cart_item.quantity = new_quantity
                 cart_item.save()
@@ -803,11 +867,12 @@ def cart_update_item(request):
             except CartItem.DoesNotExist:
                 return JsonResponse({"status": 404, "message": "Cart item not found"})
             
-            # Check stock availability
-            if quantity > cart_item.product.stock_quantity:
+            # Check stock availability, excluding stock held by pending orders
+            available = cart_item.product.available_quantity
+            if quantity > available:
                 return JsonResponse({
                     "status": 400, 
-                    "message": f"Only {cart_item.product.stock_quantity} items available in stock"
+                    "message": f"Only {max(available, 0)} items available in stock"
                 })
             
             cart_item.quantity = quantity
@@ -856,7 +921,7 @@ def get_cart(request):
         return JsonResponse({"status": 401, "message": "Authentication required"})
     
     try:
-        cart_items = CartItem.objects.filter(customer=request.user).order_by('-added_at')
+        cart_items = CartItem.objects.filter(customer=request.user).select_related('product').order_by('-added_at')
         cart_data = []
         total_amount = 0
         
@@ -887,62 +952,128 @@ def get_cart(request):
     except Exception as e:
         return JsonResponse({"status": 500, "message": str(e)})
 
+class CheckoutRejected(Exception):
+    """Raised inside the checkout transaction to roll it back with an error response"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+def cart_fingerprint(cart_items):
+    """Hash of the (product, quantity) lines of a cart, for Idempotency-Key checks"""
+    lines = sorted((item.product_id, item.quantity) for item in cart_items)
+    return hashlib.sha256(json.dumps(lines).encode('utf-8')).hexdigest()
+
 @csrf_exempt
 def cart_checkout(request):
-    """Mock checkout process - convert cart to orders"""
+    """
+    Mock checkout process - convert cart to orders.
+
+    Runs as a single transaction: cart lines are fetched with their products
+    in one query, stock is validated and reserved, all orders are inserted
+    with one bulk_create and the cart is cleared.
+
+    Clients may send an Idempotency-Key header; retries with the same key
+    replay the original response instead of creating duplicate orders.
+    Reusing a key for a different cart is refused with a 422, and keys
+    expire after settings.IDEMPOTENCY_KEY_TTL.
+    """
     if request.method == "POST":
         if not request.user.is_authenticated:
             return JsonResponse({"status": 401, "message": "Authentication required"})
         
+        idempotency_key = request.headers.get('Idempotency-Key', '').strip()[:255]
+        
         try:
-            cart_items = CartItem.objects.filter(customer=request.user)
-            
-            if not cart_items.exists():
-                return JsonResponse({"status": 400, "message": "Cart is empty"})
-            
-            # Check stock availability for all items
-            for item in cart_items:
-                if item.quantity > item.product.stock_quantity:
-                    return JsonResponse({
-                        "status": 400, 
-                        "message": f"Insufficient stock for {item.product.name}"
-                    })
-            
-            # Generate transaction ID
-            transaction_id = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S')}{request.user.id}"
-            orders_created = []
-            
-            # Create orders with pending status - don't update stock until approved
-            for item in cart_items:
-                order = Order.objects.create(
-                    customer=request.user,
-                    product=item.product,
-                    quantity=item.quantity,
-                    date_purchased=datetime.now().date(),
-                    transaction_id=transaction_id,
-                    total_amount=item.total_price,
-                    status='pending'  # Orders start as pending for manager approval
+            with transaction.atomic():
+                cart_items = list(
+                    CartItem.objects.filter(customer=request.user).select_related('product').order_by('id')
                 )
                 
-                # Don't update stock quantity here - wait for manager approval
+                if idempotency_key:
+                    fingerprint = cart_fingerprint(cart_items)
+                    try:
+                        with transaction.atomic():
+                            key_record = IdempotencyKey.objects.create(
+                                user=request.user, key=idempotency_key, fingerprint=fingerprint
+                            )
+                    except IntegrityError:
+                        key_record = IdempotencyKey.objects.get(user=request.user, key=idempotency_key)
+                        if key_record.is_expired:
+                            # Reuse the expired key for this request, unless a
+                            # concurrent request has just done the same
+                            renewed = IdempotencyKey.objects.filter(
+                                pk=key_record.pk, created_at=key_record.created_at
+                            ).update(created_at=timezone.now(), fingerprint=fingerprint, response='')
+                            if not renewed:
+                                return JsonResponse({"status": 409, "message": "A request with this Idempotency-Key is still in progress"})
+                        # A completed checkout empties the cart, so a plain
+                        # retry sees an empty cart; any other cart must match
+                        elif cart_items and key_record.fingerprint and key_record.fingerprint != fingerprint:
+                            return JsonResponse({"status": 422, "message": "This Idempotency-Key was already used for a different cart"})
+                        elif key_record.response:
+                            return HttpResponse(key_record.response, content_type='application/json')
+                        else:
+                            return JsonResponse({"status": 409, "message": "A request with this Idempotency-Key is still in progress"})
                 
-                orders_created.append({
-                    "id": order.id,
-                    "product_name": item.product.name,
-                    "quantity": item.quantity,
-                    "total_amount": float(order.total_amount),
-                    "status": order.status
-                })
-            
-            # Clear cart
-            cart_items.delete()
-            
-            return JsonResponse({
-                "status": 200, 
-                "message": "Order submitted successfully and is pending approval",
-                "transaction_id": transaction_id,
-                "orders": orders_created
-            })
+                if not cart_items:
+                    raise CheckoutRejected("Cart is empty")
+                
+                # Check stock availability for all items
+                for item in cart_items:
+                    if item.quantity > item.product.available_quantity:
+                        raise CheckoutRejected(f"Insufficient stock for {item.product.name}")
+                
+                # Hold the stock for the pending orders with one UPDATE; the
+                # reservation is conditional so a concurrent checkout can't
+                # claim it twice (a cart has one line per product)
+                if not inventory.reserve_many({item.product_id: item.quantity for item in cart_items}):
+                    raise CheckoutRejected("Insufficient stock for some items in your cart")
+                
+                # Generate transaction ID
+                transaction_id = new_transaction_id()
+                today = datetime.now().date()
+                
+                # Create orders with pending status - don't update stock until approved
+                orders = Order.objects.bulk_create([
+                    Order(
+                        customer=request.user,
+                        product=item.product,
+                        quantity=item.quantity,
+                        date_purchased=today,
+                        transaction_id=transaction_id,
+                        total_amount=item.total_price,
+                        status='pending'  # Orders start as pending for manager approval
+                    )
+                    for item in cart_items
+                ])
+                
+                # Clear cart
+                CartItem.objects.filter(id__in=[item.id for item in cart_items]).delete()
+                
+                response_data = {
+                    "status": 200, 
+                    "message": "Order submitted successfully and is pending approval",
+                    "transaction_id": transaction_id,
+                    "orders": [
+                        {
+                            "id": order.id,
+                            "product_name": order.product.name,
+                            "quantity": order.quantity,
+                            "total_amount": float(order.total_amount),
+                            "status": order.status
+                        }
+                        for order in orders
+                    ]
+                }
+                
+                if idempotency_key:
+                    key_record.response = json.dumps(response_data, cls=DjangoJSONEncoder)
+                    key_record.save(update_fields=['response'])
+                
+                return JsonResponse(response_data)
+        except CheckoutRejected as e:
+            return JsonResponse({"status": 400, "message": e.message})
         except Exception as e:
             return JsonResponse({"status": 500, "message": str(e)})
     else:
@@ -950,19 +1081,10 @@ def cart_checkout(request):
 
 # Order Fulfillment Management Views
 @require_GET
+@read_replica
+@require_role('manager', 'admin')
 def get_pending_orders(request):
     """Get all pending orders for manager review"""
-    if not request.user.is_authenticated:
-        return JsonResponse({"status": 401, "message": "Authentication required"})
-    
-    # Check if user has manager/admin role
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role not in ['admin', 'manager']:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "message": "Access denied"})
-    
     try:
         pending_orders = Order.objects.filter(status='pending').select_related('customer', 'product').order_by('-date_purchased')
         orders_data = []
@@ -989,60 +1111,39 @@ def get_pending_orders(request):
         return JsonResponse({"status": 500, "message": str(e)})
 
 @require_GET
+@read_replica
+@require_role('manager', 'admin')
 def get_all_orders_for_management(request):
-    """Get all orders for management overview"""
-    if not request.user.is_authenticated:
-        return JsonResponse({"status": 401, "message": "Authentication required"})
-    
-    # Check if user has manager/admin role
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role not in ['admin', 'manager']:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "message": "Access denied"})
-    
+    """Get all orders for management overview, streamed (?format=ndjson for NDJSON)"""
     try:
         orders = Order.objects.all().select_related('customer', 'product', 'processed_by').order_by('-date_purchased')
-        orders_data = []
-        
-        for order in orders:
-            orders_data.append({
-                "id": order.id,
-                "transaction_id": order.transaction_id,
-                "customer_name": f"{order.customer.first_name} {order.customer.last_name}".strip() or order.customer.username,
-                "customer_username": order.customer.username,
-                "product_name": order.product.name,
-                "product_category": order.product.category,
-                "quantity": order.quantity,
-                "unit_price": float(order.product.price),
-                "total_amount": float(order.total_amount),
-                "date_purchased": order.date_purchased.isoformat(),
-                "status": order.status,
-                "processed_by": order.processed_by.username if order.processed_by else None,
-                "processed_at": order.processed_at.isoformat() if order.processed_at else None,
-                "notes": order.notes
-            })
-        
-        return JsonResponse({"status": 200, "orders": orders_data})
+        return streaming.list_response(request, "orders", streaming.iterate(orders, management_order_row))
     except Exception as e:
         return JsonResponse({"status": 500, "message": str(e)})
 
+def management_order_row(order):
+    return {
+        "id": order.id,
+        "transaction_id": order.transaction_id,
+        "customer_name": f"{order.customer.first_name} {order.customer.last_name}".strip() or order.customer.username,
+        "customer_username": order.customer.username,
+        "product_name": order.product.name,
+        "product_category": order.product.category,
+        "quantity": order.quantity,
+        "unit_price": float(order.product.price),
+        "total_amount": float(order.total_amount),
+        "date_purchased": order.date_purchased.isoformat(),
+        "status": order.status,
+        "processed_by": order.processed_by.username if order.processed_by else None,
+        "processed_at": order.processed_at.isoformat() if order.processed_at else None,
+        "notes": order.notes
+    }
+
 @csrf_exempt
+@require_role('manager', 'admin')
 def process_order(request):
     """Approve or reject an order"""
     if request.method == "POST":
-        if not request.user.is_authenticated:
-            return JsonResponse({"status": 401, "message": "Authentication required"})
-        
-        # Check if user has manager/admin role
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-            if profile.role not in ['admin', 'manager']:
-                return JsonResponse({"status": 403, "message": "Access denied"})
-        except UserProfile.DoesNotExist:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-        
         try:
             data = json.loads(request.body)
             order_id = data.get('order_id')
@@ -1057,35 +1158,17 @@ def process_order(request):
             except Order.DoesNotExist:
                 return JsonResponse({"status": 404, "message": "Order not found or already processed"})
             
-            if action == 'approve':
-                # Check if enough stock is available
-                if order.quantity > order.product.stock_quantity:
-                    return JsonResponse({
-                        "status": 400, 
-                        "message": f"Insufficient stock. Only {order.product.stock_quantity} items available"
-                    })
-                
-                # Update stock quantity
-                order.product.stock_quantity -= order.quantity
-                order.product.save()
-                
-                # Update order status
-                order.status = 'approved'
-                order.processed_by = request.user
-                order.processed_at = datetime.now()
-                order.notes = notes
-                order.save()
-                
-                message = f"Order {order.transaction_id} approved successfully"
-            
-            else:  # reject
-                order.status = 'rejected'
-                order.processed_by = request.user
-                order.processed_at = datetime.now()
-                order.notes = notes
-                order.save()
-                
-                message = f"Order {order.transaction_id} rejected"
+            try:
+                if action == 'approve':
+                    inventory.approve_order(order, request.user, notes)
+                    message = f"Order {order.transaction_id} approved successfully"
+                else:  # reject
+                    inventory.reject_order(order, request.user, notes)
+                    message = f"Order {order.transaction_id} rejected"
+            except inventory.OrderAlreadyProcessed:
+                return JsonResponse({"status": 404, "message": "Order not found or already processed"})
+            except inventory.InsufficientStock as e:
+                return JsonResponse({"status": 400, "message": str(e)})
             
             return JsonResponse({
                 "status": 200, 
@@ -1102,149 +1185,277 @@ def process_order(request):
     else:
         return JsonResponse({"status": 405, "message": "Method not allowed"})
 
+BULK_PROCESS_MAX_ORDERS = 1000
+
+@csrf_exempt
+@require_role('manager', 'admin')
+def process_orders_bulk(request):
+    """
+    Approve or reject many orders in one request and one transaction.
+
+    Body: {"order_ids": [...]} or {"transaction_id": "..."}, plus
+    "action" ('approve' or 'reject') and optional "notes".
+    Returns the outcome for every requested order.
+    """
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            order_ids = data.get('order_ids')
+            transaction_id = data.get('transaction_id')
+            action = data.get('action')
+            notes = data.get('notes', '')
+            
+            if action not in ['approve', 'reject']:
+                return JsonResponse({"status": 400, "message": "Invalid action"})
+            
+            if order_ids:
+                if not isinstance(order_ids, list) or len(order_ids) > BULK_PROCESS_MAX_ORDERS:
+                    return JsonResponse({
+                        "status": 400,
+                        "message": f"order_ids must be a list of at most {BULK_PROCESS_MAX_ORDERS} ids"
+                    })
+                try:
+                    order_ids = [int(order_id) for order_id in order_ids]
+                except (TypeError, ValueError):
+                    return JsonResponse({"status": 400, "message": "order_ids must be integers"})
+                orders = Order.objects.filter(id__in=order_ids)
+            elif transaction_id:
+                orders = Order.objects.filter(transaction_id=transaction_id)
+                order_ids = []
+            else:
+                return JsonResponse({"status": 400, "message": "order_ids or transaction_id is required"})
+            
+            try:
+                outcomes = inventory.bulk_process_orders(orders, action, request.user, notes)
+            except inventory.OrderAlreadyProcessed:
+                return JsonResponse({
+                    "status": 409,
+                    "message": "Some orders were processed concurrently, nothing was changed. Please retry."
+                })
+            
+            for order_id in order_ids:
+                outcomes.setdefault(order_id, 'not_found')
+            
+            summary = {}
+            for outcome in outcomes.values():
+                summary[outcome] = summary.get(outcome, 0) + 1
+            
+            return JsonResponse({
+                "status": 200,
+                "message": f"Processed {summary.get('approved', 0) + summary.get('rejected', 0)} of {len(outcomes)} orders",
+                "summary": summary,
+                "results": [
+                    {"order_id": order_id, "result": outcome}
+                    for order_id, outcome in sorted(outcomes.items())
+                ]
+            })
+        except Exception as e:
+            return JsonResponse({"status": 500, "message": str(e)})
+    else:
+        return JsonResponse({"status": 405, "message": "Method not allowed"})
+
+INVENTORY_LOW_STOCK_THRESHOLD = 10
+INVENTORY_DEFAULT_PAGE_SIZE = 50
+INVENTORY_MAX_PAGE_SIZE = 500
+INVENTORY_SORT_FIELDS = {
+    'name', 'category', 'price', 'current_stock', 'pending_orders',
+    'available_after_pending', 'created_at'
+}
+
+def inventory_queryset(params):
+    """
+    Build the inventory overview as a single-table query.
+
+    Pending quantities come from the maintained Product.reserved_quantity
+    counter, and the stock flags are computed in SQL so they can be filtered
+    and sorted on.
+
+    Query parameters:
+        category      -- only products in this category
+        stock_status  -- 'low' or 'out'
+        sort          -- one of INVENTORY_SORT_FIELDS, prefix with '-' for descending
+    Raises ValueError for unknown sort fields or stock statuses.
+    """
+    products = Product.objects.filter(is_active=True).annotate(
+        current_stock=F('stock_quantity'),
+        pending_orders=F('reserved_quantity'),
+    ).annotate(
+        available_after_pending=F('stock_quantity') - F('pending_orders'),
+        is_low_stock=ExpressionWrapper(
+            Q(stock_quantity__lte=INVENTORY_LOW_STOCK_THRESHOLD), output_field=BooleanField()
+        ),
+        is_out_of_stock=ExpressionWrapper(Q(stock_quantity=0), output_field=BooleanField()),
+    )
+
+    category = params.get('category')
+    if category:
+        products = products.filter(category=category)
+
+    stock_status = params.get('stock_status')
+    if stock_status == 'low':
+        products = products.filter(is_low_stock=True)
+    elif stock_status == 'out':
+        products = products.filter(is_out_of_stock=True)
+    elif stock_status:
+        raise ValueError("Invalid stock_status")
+
+    sort = params.get('sort', 'name')
+    if sort.lstrip('-') not in INVENTORY_SORT_FIELDS:
+        raise ValueError("Invalid sort field")
+    tiebreak = '-id' if sort.startswith('-') else 'id'
+
+    return products.order_by(sort, tiebreak).values(
+        'id', 'name', 'category', 'price', 'stock_quantity', 'pending_orders',
+        'available_after_pending', 'is_low_stock', 'is_out_of_stock', 'created_at'
+    )
+
 @require_GET
+@read_replica
+@require_role('manager', 'admin')
 def get_inventory_overview(request):
-    """Get inventory overview for management"""
-    if not request.user.is_authenticated:
-        return JsonResponse({"status": 401, "message": "Authentication required"})
-    
-    # Check if user has manager/admin role
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role not in ['admin', 'manager']:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "message": "Access denied"})
-    
+    """
+    Get inventory overview for management.
+    Supports the filters and sorting of inventory_queryset, plus optional
+    page/page_size pagination.
+    """
     try:
-        products = Product.objects.filter(is_active=True).order_by('name')
-        inventory_data = []
-        
-        # Calculate pending orders for each product
-        # Sum already imported at the top of the file
-        
-        for product in products:
-            pending_quantity = Order.objects.filter(
-                product=product, 
-                status='pending'
-            ).aggregate(Sum('quantity'))['quantity__sum'] or 0
-            
-            available_after_pending = product.stock_quantity - pending_quantity
-            
-            inventory_data.append({
-                "id": product.id,
-                "name": product.name,
-                "category": product.category,
-                "price": float(product.price),
-                "current_stock": product.stock_quantity,
-                "pending_orders": pending_quantity,
-                "available_after_pending": available_after_pending,
-                "is_low_stock": product.stock_quantity <= 10,
-                "is_out_of_stock": product.stock_quantity == 0,
-                "created_at": product.created_at.isoformat()
+        try:
+            rows = inventory_queryset(request.GET)
+        except ValueError as e:
+            return JsonResponse({"status": 400, "message": str(e)})
+
+        response_data = {"status": 200}
+
+        # Paginate only when asked so existing clients still get the full list
+        if 'page' in request.GET or 'page_size' in request.GET:
+            try:
+                page = max(1, int(request.GET.get('page', 1)))
+                page_size = max(1, min(int(request.GET.get('page_size', INVENTORY_DEFAULT_PAGE_SIZE)), INVENTORY_MAX_PAGE_SIZE))
+            except ValueError:
+                return JsonResponse({"status": 400, "message": "Invalid page or page_size"})
+            total = rows.count()
+            offset = (page - 1) * page_size
+            rows = rows[offset:offset + page_size]
+            response_data.update({
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+                "has_more": offset + page_size < total
             })
-        
-        return JsonResponse({"status": 200, "inventory": inventory_data})
+
+        response_data["inventory"] = [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "category": row["category"],
+                "price": float(row["price"]),
+                "current_stock": row["stock_quantity"],
+                "pending_orders": row["pending_orders"],
+                "available_after_pending": row["available_after_pending"],
+                "is_low_stock": row["is_low_stock"],
+                "is_out_of_stock": row["is_out_of_stock"],
+                "created_at": row["created_at"].isoformat()
+            }
+            for row in rows
+        ]
+        return JsonResponse(response_data)
     except Exception as e:
         return JsonResponse({"status": 500, "message": str(e)})
 
 @require_GET
+@read_replica
+@require_role('manager', 'admin', allow_staff=True)
 def get_reviews_for_management(request):
-    # Check if user has manager/admin privileges
-    user_role = None
-    
-    try:
-        # Check if the user has a profile with a role
-        if hasattr(request.user, 'userprofile'):
-            user_role = request.user.userprofile.role.lower() if request.user.userprofile.role else None
-    except:
-        pass
-    
-    # Try to get the session role
-    session_role = request.session.get('userRole', '').lower() if 'userRole' in request.session else None
-    
     # Special check for demo users based on username (case insensitive)
     username_lower = request.user.username.lower()
     if username_lower.startswith('demo_') and ('admin' in username_lower or 'manager' in username_lower):
-        return JsonResponse({"status": 200, "reviews": get_demo_reviews()})
+        return streaming.list_response(request, "reviews", get_demo_reviews())
     
-    # Allow access if the user is staff, superuser, has admin/manager role in their profile, or in the session
-    if not (request.user.is_staff or request.user.is_superuser or 
-            user_role in ['admin', 'manager'] or 
-            session_role in ['admin', 'manager']):
-        return JsonResponse({"status": 403, "message": "Access denied"})
-    
-    # Get all reviews for management
+    # Get all reviews for management, streamed (?format=ndjson for NDJSON)
     reviews = Review.objects.select_related('customer').order_by('-created_on')
+    return streaming.list_response(request, "reviews", streaming.iterate(reviews, management_review_row))
+
+def management_review_row(r):
+    review_data = {
+        'id': r.id,
+        'customer': r.customer.username,
+        'customer_name': f"{r.customer.first_name} {r.customer.last_name}".strip() or r.customer.username,
+        'rating': r.rating,
+        'review_text': r.review_text,
+        'created_on': r.created_on,
+        'moderated': getattr(r, 'moderated', False),
+        'sentiment': r.sentiment
+    }
     
-    review_list = []
-    for r in reviews:
-        review_data = {
-            'id': r.id,
-            'customer': r.customer.username,
-            'customer_name': f"{r.customer.first_name} {r.customer.last_name}".strip() or r.customer.username,
-            'rating': r.rating,
-            'review_text': r.review_text,
-            'created_on': r.created_on,
-            'moderated': getattr(r, 'moderated', False),
-            'sentiment': r.sentiment
-        }
-        
-        # Add product info if this is a legacy product review
-        if hasattr(r, 'product') and r.product:
-            review_data.update({
-                'product_name': r.product.name,
-                'product_id': r.product.id,
-                'is_product_review': True
-            })
-        else:
-            review_data.update({
-                'is_product_review': False,
-                'review_type': 'Shopping Experience'
-            })
-            
-        review_list.append(review_data)
-    
-    return JsonResponse({"status": 200, "reviews": review_list})
+    # Add product info if this is a legacy product review
+    if hasattr(r, 'product') and r.product:
+        review_data.update({
+            'product_name': r.product.name,
+            'product_id': r.product.id,
+            'is_product_review': True
+        })
+    else:
+        review_data.update({
+            'is_product_review': False,
+            'review_type': 'Shopping Experience'
+        })
+    return review_data
 
 @require_GET
+@read_replica
+@require_role('manager', 'admin')
 def get_tickets_for_management(request):
-    """Get all support tickets for management overview"""
-    if not request.user.is_authenticated:
-        return JsonResponse({"status": 401, "message": "Authentication required"})
-    
-    # Check if user has manager/admin role
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role not in ['admin', 'manager']:
-            return JsonResponse({"status": 403, "message": "Access denied"})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({"status": 403, "message": "Access denied"})
-    
+    """Get all support tickets for management overview, streamed (?format=ndjson for NDJSON)"""
     try:
         tickets = SupportTicket.objects.all().select_related('customer', 'product', 'order').order_by('-submitted_on')
-        tickets_data = []
-        
-        for ticket in tickets:
-            tickets_data.append({
-                "id": ticket.id,
-                "customer_name": f"{ticket.customer.first_name} {ticket.customer.last_name}".strip() or ticket.customer.username,
-                "customer_username": ticket.customer.username,
-                "product_name": ticket.product.name,
-                "product_category": ticket.product.category,
-                "order_id": ticket.order.id,
-                "transaction_id": ticket.order.transaction_id,
-                "issue_description": ticket.issue_description,
-                "status": ticket.status,
-                "submitted_on": ticket.submitted_on.isoformat(),
-                "resolution_note": ticket.resolution_note,
-                "has_attachment": bool(ticket.attachment)
-            })
-        
-        return JsonResponse({"status": 200, "tickets": tickets_data})
+        return streaming.list_response(request, "tickets", streaming.iterate(tickets, management_ticket_row))
     except Exception as e:
         return JsonResponse({"status": 500, "message": str(e)})
 
+def management_ticket_row(ticket):
+    return {
+        "id": ticket.id,
+        "customer_name": f"{ticket.customer.first_name} {ticket.customer.last_name}".strip() or ticket.customer.username,
+        "customer_username": ticket.customer.username,
+        "product_name": ticket.product.name,
+        "product_category": ticket.product.category,
+        "order_id": ticket.order.id,
+        "transaction_id": ticket.order.transaction_id,
+        "issue_description": ticket.issue_description,
+        "status": ticket.status,
+        "submitted_on": ticket.submitted_on.isoformat(),
+        "resolution_note": ticket.resolution_note,
+        "has_attachment": bool(ticket.attachment)
+    }
+
+@require_GET
+@read_replica
+@require_role('manager', 'admin')
+def export_table(request, table):
+    """
+    Download orders, tickets or reviews as a file, streamed.
+    Query parameters: format (csv or ndjson), gzip (1 to compress),
+    since and until (YYYY-MM-DD, inclusive) and status (comma-separated).
+    """
+    output_format = request.GET.get('format', 'csv')
+    compress = request.GET.get('gzip', '').lower() in ('1', 'true')
+    statuses = [status for status in request.GET.get('status', '').split(',') if status]
+    try:
+        rows = exports.queryset(
+            table,
+            since=exports.parse_day(request.GET.get('since'), 'since'),
+            until=exports.parse_day(request.GET.get('until'), 'until'),
+            statuses=statuses,
+        )
+        body = exports.stream(rows, table, output_format, compress)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+
+    content_type = 'application/gzip' if compress else exports.FORMATS[output_format]
+    response = streaming.streaming_response(request, body, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{exports.filename(table, output_format, compress)}"'
+    return response
+
 @csrf_exempt
 @login_required
 def post_experience_review(request):
@@ -1254,7 +1465,7 @@ def post_experience_review(request):
         rating = data.get("rating")
         
         # Check if user has already submitted a review today
-        today = datetime.datetime.now().date()
+        today = datetime.now().date()
         has_review_today = Review.objects.filter(
             customer=request.user,
             created_on__date=today
@@ -1266,16 +1477,18 @@ def post_experience_review(request):
                 "message": "You can only submit one review per day."
             })
 
-        # Skip sentiment analysis for now
-        sentiment = "neutral"
-        
-        # Create the review (no product association)
-        review = Review.objects.create(
-            customer=request.user,
-            review_text=review_text,
-            rating=rating,
-            sentiment=sentiment
-        )
+        # Create the review (no product association). It starts out neutral
+        # and a background worker fills in the analyzed sentiment, so the
+        # response doesn't wait on the sentiment analyzer. The job is queued
+        # in the same transaction, so no review is left without one.
+        with transaction.atomic():
+            review = Review.objects.create(
+                customer=request.user,
+                review_text=review_text,
+                rating=rating,
+                sentiment="neutral"
+            )
+            jobs.enqueue('score_review_sentiment', {'review_id': review.id})
         
         return JsonResponse({
             "status": 200, 
@@ -1291,6 +1504,7 @@ def post_experience_review(request):
     return JsonResponse({"status": 405, "message": "Method not allowed"})
 
 @require_GET
+@read_replica
 def get_public_reviews(request):
     # Get reviews that can be publicly viewed (for all customers)
     reviews = Review.objects.select_related('customer').order_by('-created_on')[:50]  # Limit to most recent 50
@@ -3,6 +3,10 @@ ASGI config for djangoproj project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Django itself only speaks ASGI/HTTP, so lifespan events are handled here:
+each worker opens the pooled client used by the async upstream calls at
+startup and closes it at shutdown.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
@@ -13,4 +17,26 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Needs the app registry that get_asgi_application() sets up
+from djangoapp import restapis  # noqa: E402
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await restapis.open_async_client()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await restapis.close_async_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -26,7 +26,7 @@ echo "WatsonX: [configured]"
 
 # Start Flask sentiment service in background
 cd /app/flask
-python app.py &
+gunicorn --config gunicorn.conf.py app:app &
 FLASK_PID=$!
 echo "Flask sentiment service started with PID: $FLASK_PID"
 
@@ -53,6 +53,12 @@ echo "Express API service started with PID: $EXPRESS_PID"
 cd /app/django
 echo "Starting Django application on port 8000 (main port Render will use)..."
 
+# Django worker processes, and a cache they all share so that catalog
+# invalidations reach every worker (see the djangoapp.W001 check)
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-3}"
+export CACHE_BACKEND="${CACHE_BACKEND:-django.core.cache.backends.filebased.FileBasedCache}"
+export CACHE_LOCATION="${CACHE_LOCATION:-/tmp/django-cache}"
+
 # Run Django migrations and collect static files
 echo "================ DATABASE SETUP START ================"
 # First run a basic database diagnosis
@@ -70,6 +76,7 @@ python manage.py makemigrations djangoapp --noinput || echo "makemigrations djan
 python manage.py migrate djangoapp --noinput || echo "migrate djangoapp failed, continuing"
 python manage.py makemigrations --noinput || echo "makemigrations failed, continuing"
 python manage.py migrate --noinput || echo "migrate failed, continuing"
+python manage.py purge_idempotency_keys || echo "purge_idempotency_keys failed, continuing"
 
 echo "Running comprehensive database setup script..."
 # Run our special database setup script that handles migrations and data population
@@ -180,14 +187,20 @@ sleep 5
 
 # Render automatically assigns PORT environment variable - use it, fallback to 8000
 PORT="${PORT:-8000}"
-echo "================ STARTING GUNICORN ================"
+echo "================ STARTING UVICORN ================"
 echo "Binding to port $PORT"
 echo "Current directory: $(pwd)"
 echo "Database file status:"
 ls -la db.sqlite3 || echo "db.sqlite3 not found"
 echo "Quick database check:"
 sqlite3 db.sqlite3 "SELECT COUNT(*) FROM djangoapp_product;" || echo "Failed to query product count"
-echo "================ GUNICORN STARTING ================"
+echo "================ UVICORN STARTING ================"
+
+# Start the background job worker (sentiment scoring of new reviews)
+python manage.py run_worker --threads "${JOB_WORKER_THREADS:-2}" &
+WORKER_PID=$!
+echo "Job worker started with PID: $WORKER_PID"
 
-# Start Django with gunicorn
-exec gunicorn --bind 0.0.0.0:$PORT --workers 3 djangoproj.wsgi
\ No newline at end of file
+# Start Django with uvicorn (ASGI), so the async views share one pooled
+# upstream client per worker, opened and closed in the ASGI lifespan
+exec uvicorn djangoproj.asgi:application --host 0.0.0.0 --port $PORT --workers $WEB_CONCURRENCY --lifespan on
\ No newline at end of file
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import SimpleNav from '../SimpleNav/SimpleNav';
 import Footer from '../Footer/Footer';
@@ -16,16 +16,24 @@ const Shop = () => {
   const [error, setError] = useState(null);
   const [selectedCategory, setSelectedCategory] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
+  const [inStockOnly, setInStockOnly] = useState(false);
   const [activeTab, setActiveTab] = useState('browse');
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [cartLoading, setCartLoading] = useState(false);
   
-  // Pagination state
-  const [currentPage, setCurrentPage] = useState(1);
-  const itemsPerPage = 20;
+  // Keyset pagination state: the cursor of the next page, null on the last one
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const itemsPerPage = 24;
+  // Id of the latest product request, so a slow response for a previous
+  // filter can't overwrite the current one
+  const productRequest = useRef(0);
 
   useEffect(() => {
     fetchProducts();
+  }, [selectedCategory, inStockOnly]); // eslint-disable-line react-hooks/exhaustive-deps
+
+  useEffect(() => {
     fetchCategories();
     checkAuthStatus();
     // Check for tab parameter
@@ -75,19 +83,36 @@ const Shop = () => {
     setIsLoggedIn(!!username);
   };
 
-  const fetchProducts = async () => {
+  // Fetch one page of the catalog. The category and stock filters are applied
+  // by the server; without a cursor the first page replaces the loaded products,
+  // with one the page is appended to them.
+  const fetchProducts = async (cursor = null) => {
+    const requestId = ++productRequest.current;
+    const params = new URLSearchParams({ limit: itemsPerPage });
+    if (selectedCategory) params.set('category', selectedCategory);
+    if (inStockOnly) params.set('in_stock', 'true');
+    if (cursor) params.set('cursor', cursor);
+
+    setLoadingMore(true);
     try {
-      const response = await fetch(API_URLS.PRODUCTS);
+      const response = await fetch(`${API_URLS.PRODUCTS}?${params}`);
       const data = await response.json();
-      if (data.status === 200) {
-        setProducts(data.products);
-      } else {
+      if (requestId !== productRequest.current) return;
+      if (data.status !== 200) {
         setError('Failed to load products');
+        return;
       }
+      setProducts(prev => (cursor ? prev.concat(data.products) : data.products));
+      setNextCursor(data.next_cursor);
     } catch (err) {
-      setError('Error loading products: ' + err.message);
+      if (requestId === productRequest.current) {
+        setError('Error loading products: ' + err.message);
+      }
     } finally {
-      setLoading(false);
+      if (requestId === productRequest.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
 
@@ -219,39 +244,35 @@ const Shop = () => {
     navigate(`/product/${productId}`);
   };
 
-  // Filter and paginate products
+  // The search box narrows the products loaded so far; category and stock
+  // are filtered by the server
   const filteredProducts = products.filter(product => {
-    const matchesCategory = !selectedCategory || product.category === selectedCategory;
-    const matchesSearch = !searchTerm || 
+    return !searchTerm ||
       product.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
       product.description.toLowerCase().includes(searchTerm.toLowerCase());
-    return matchesCategory && matchesSearch;
   });
 
-  // Pagination calculations
-  const totalPages = Math.ceil(filteredProducts.length / itemsPerPage);
-  const startIndex = (currentPage - 1) * itemsPerPage;
-  const endIndex = startIndex + itemsPerPage;
-  const currentProducts = filteredProducts.slice(startIndex, endIndex);
-
-  // Handle page change
-  const handlePageChange = (pageNumber) => {
-    setCurrentPage(pageNumber);
-    window.scrollTo({ top: 0, behavior: 'smooth' });
-  };
-
-  // Handle category change - reset to page 1
+  // Changing a server-side filter starts again from the first page
   const handleCategoryChange = (category) => {
     setSelectedCategory(category);
-    setCurrentPage(1);
   };
 
-  // Handle search change - reset to page 1
+  const handleInStockChange = (checked) => {
+    setInStockOnly(checked);
+  };
+
   const handleSearchChange = (search) => {
     setSearchTerm(search);
-    setCurrentPage(1);
   };
 
+  const handleLoadMore = () => {
+    if (nextCursor && !loadingMore) {
+      fetchProducts(nextCursor);
+    }
+  };
+
+  const loadedCount = `${products.length}${nextCursor ? '+' : ''}`;
+
   const cartTotal = cartItems.reduce((total, item) => {
     const itemTotal = isNaN(parseFloat(item.total_price)) ? 0 : parseFloat(item.total_price);
     return total + itemTotal;
@@ -299,7 +320,7 @@ const Shop = () => {
             className={`shop-tab ${activeTab === 'browse' ? 'active' : ''}`}
             onClick={() => setActiveTab('browse')}
           >
-            Browse Products ({products.length})
+            Browse Products ({loadedCount})
           </button>
           {isLoggedIn && (
             <button 
@@ -323,20 +344,17 @@ const Shop = () => {
                     className={`category-item ${selectedCategory === '' ? 'active' : ''}`}
                     onClick={() => handleCategoryChange('')}
                   >
-                    All Categories ({products.length})
+                    All Categories
                   </button>
-                  {categories.map(category => {
-                    const categoryCount = products.filter(p => p.category === category).length;
-                    return (
-                      <button
-                        key={category}
-                        className={`category-item ${selectedCategory === category ? 'active' : ''}`}
-                        onClick={() => handleCategoryChange(category)}
-                      >
-                        {category} ({categoryCount})
-                      </button>
-                    );
-                  })}
+                  {categories.map(category => (
+                    <button
+                      key={category}
+                      className={`category-item ${selectedCategory === category ? 'active' : ''}`}
+                      onClick={() => handleCategoryChange(category)}
+                    >
+                      {category}
+                    </button>
+                  ))}
                 </div>
               </div>
 
@@ -352,16 +370,23 @@ const Shop = () => {
                       onChange={(e) => handleSearchChange(e.target.value)}
                       className="search-input"
                     />
+                    <label className="stock-filter">
+                      <input
+                        type="checkbox"
+                        checked={inStockOnly}
+                        onChange={(e) => handleInStockChange(e.target.checked)}
+                      />
+                      In stock only
+                    </label>
                   </div>
                   <div className="results-info">
-                    Showing {currentProducts.length} of {filteredProducts.length} products
-                    {currentPage > 1 && ` (Page ${currentPage} of ${totalPages})`}
+                    Showing {filteredProducts.length} of {loadedCount} products
                   </div>
                 </div>
 
                 {/* Products Grid */}
                 <div className="products-grid">
-                  {currentProducts.map(product => {
+                  {filteredProducts.map(product => {
                     const cartQuantity = getCartQuantity(product.id);
                     return (
                       <div 
@@ -407,54 +432,20 @@ const Shop = () => {
                   })}
                 </div>
 
-                {/* Pagination */}
-                {totalPages > 1 && (
+                {/* Load the next page on demand */}
+                {nextCursor && (
                   <div className="pagination">
                     <button
-                      onClick={() => handlePageChange(currentPage - 1)}
-                      disabled={currentPage === 1}
-                      className="pagination-btn"
-                    >
-                      Previous
-                    </button>
-                    
-                    {Array.from({ length: totalPages }, (_, index) => {
-                      const pageNumber = index + 1;
-                      // Show first page, last page, current page, and 2 pages around current
-                      const showPage = pageNumber === 1 || 
-                                      pageNumber === totalPages || 
-                                      Math.abs(pageNumber - currentPage) <= 2;
-                      
-                      if (!showPage) {
-                        // Show ellipsis for gaps
-                        if (pageNumber === currentPage - 3 || pageNumber === currentPage + 3) {
-                          return <span key={pageNumber} className="pagination-ellipsis">...</span>;
-                        }
-                        return null;
-                      }
-                      
-                      return (
-                        <button
-                          key={pageNumber}
-                          onClick={() => handlePageChange(pageNumber)}
-                          className={`pagination-btn ${currentPage === pageNumber ? 'active' : ''}`}
-                        >
-                          {pageNumber}
-                        </button>
-                      );
-                    })}
-                    
-                    <button
-                      onClick={() => handlePageChange(currentPage + 1)}
-                      disabled={currentPage === totalPages}
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
                       className="pagination-btn"
                     >
-                      Next
+                      {loadingMore ? 'Loading...' : 'Load more'}
                     </button>
                   </div>
                 )}
 
-                {filteredProducts.length === 0 && (
+                {filteredProducts.length === 0 && !loadingMore && (
                   <div className="no-products">
                     <h3>No products found</h3>
                     <p>Try adjusting your search or category filter.</p>